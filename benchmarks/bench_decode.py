@@ -0,0 +1,84 @@
+"""
+Microbenchmark: per-response cost of decoding a Dhan v2 intraday reply.
+
+    python benchmarks/bench_decode.py [--bars 35 375 1875] [--repeat 200]
+
+Compares the old list-based decoder (safe_list padding + datetime.fromtimestamp
+per element) with fno_scanner.dhan.decode_intraday.
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fno_scanner.config import IST  # noqa: E402
+from fno_scanner.dhan import decode_intraday  # noqa: E402
+
+
+def legacy_decode(data):
+    closes = data.get("close", [])
+    if not closes:
+        return pd.DataFrame()
+    n = len(closes)
+
+    def safe_list(lst):
+        return lst if len(lst) == n else (lst + [lst[-1]] * (n - len(lst)) if lst else [0] * n)
+
+    ts = safe_list(data.get("timestamp", []))
+    dt_index = [
+        datetime.fromtimestamp(t, tz=IST) if isinstance(t, (int, float)) else
+        datetime.fromtimestamp(float(t), tz=IST)
+        for t in ts
+    ]
+    return pd.DataFrame(
+        {
+            "ts": [int(float(t)) for t in ts],
+            "datetime": dt_index,
+            "Open": safe_list(data.get("open", [])),
+            "High": safe_list(data.get("high", [])),
+            "Low": safe_list(data.get("low", [])),
+            "Close": closes,
+            "Volume": safe_list(data.get("volume", [])),
+            "OI": safe_list(data.get("open_interest", [])),
+        }
+    )
+
+
+def fake_response(n_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = (1000 + np.cumsum(rng.normal(0, 2, n_bars))).round(2)
+    return {
+        "open": (close + rng.normal(0, 1, n_bars)).round(2).tolist(),
+        "high": (close + 2).tolist(),
+        "low": (close - 2).tolist(),
+        "close": close.tolist(),
+        "volume": rng.integers(1_000, 100_000, n_bars).tolist(),
+        "timestamp": (1_760_000_000 + 60 * np.arange(n_bars)).tolist(),
+        "open_interest": rng.integers(100_000, 1_000_000, n_bars).tolist(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, nargs="+", default=[35, 375, 1875])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'bars':>6} {'legacy us':>10} {'columnar us':>12} {'speedup':>8}")
+    for n in args.bars:
+        data = fake_response(n)
+        old = min(timeit.repeat(lambda: legacy_decode(data), number=args.repeat, repeat=3))
+        new = min(timeit.repeat(lambda: decode_intraday(data), number=args.repeat, repeat=3))
+        old_us = old / args.repeat * 1e6
+        new_us = new / args.repeat * 1e6
+        print(f"{n:>6} {old_us:>10.0f} {new_us:>12.0f} {old_us / new_us:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""
+End-to-end scanner benchmark, offline: a local stub Dhan server serves
+/charts/intraday, /charts/historical and /marketfeed/ltp replies for the
+whole dhan_master.csv FUTSTK universe.
+
+No recorded replies are committed, so as shipped the benchmark is synthetic
+only: deterministic random-walk bars and closes per security id. That
+measures the scanner's own overhead (HTTP client, decoding, merging,
+indicators, scoring) on a realistic request pattern, not market-dependent
+behaviour such as how many symbols signal. Replies recorded from the real
+API replace the synthetic ones per security when --recordings is given:
+
+    python benchmarks/bench_scan.py                       # synthetic replies
+    python benchmarks/bench_scan.py --compare benchmarks/results/bench_scan-abc1234.json
+
+    # record real replies once (needs DHAN_CLIENT_ID / DHAN_ACCESS_TOKEN),
+    # then replay them (kept out of the repo: <endpoint>/<securityId>.json):
+    python benchmarks/bench_scan.py --record /path/to/recordings --scans 1
+    python benchmarks/bench_scan.py --recordings /path/to/recordings
+
+Times full scans (cold, then incremental), per-symbol processing and the
+dashboard refresh path, and writes throughput and p50 / p99 latencies to
+benchmarks/results/ as JSON so runs can be compared between commits.
+The Dhan rate limit is lifted unless --dhan-rate is given.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REAL_BASE = "https://api.dhan.co/v2"
+IST_OFFSET = 19800
+SESSION_OPEN = 9 * 3600 + 15 * 60
+SESSION_BARS_1M = 375  # 09:15-15:30
+FORWARD_HEADERS = ("access-token", "client-id", "content-type", "accept")
+
+
+def _seed(security_id):
+    return int("".join(c for c in str(security_id) if c.isdigit()) or 0) % (2**32)
+
+
+def _trading_days(end, n):
+    """The n weekdays up to and including `end` (a date), oldest first."""
+    days = []
+    day = end
+    while len(days) < n:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    return days[::-1]
+
+
+def _today():
+    return (datetime.now(timezone.utc) + timedelta(seconds=IST_OFFSET)).date()
+
+
+def _epoch(dt):
+    """Naive IST date / datetime -> epoch seconds."""
+    if not isinstance(dt, datetime):
+        dt = datetime(dt.year, dt.month, dt.day)
+    return int((dt - datetime(1970, 1, 1)).total_seconds()) - IST_OFFSET
+
+
+def synthetic_intraday(security_id, interval, days=6):
+    """Deterministic random-walk bars for the last `days` weekdays."""
+    rng = np.random.default_rng(_seed(security_id))
+    per_day = SESSION_BARS_1M // interval
+    ts = np.concatenate(
+        [
+            _epoch(d) + SESSION_OPEN + interval * 60 * np.arange(per_day)
+            for d in _trading_days(_today(), days)
+        ]
+    )
+    n = len(ts)
+    close = (rng.uniform(100, 3000) * np.exp(np.cumsum(rng.normal(0, 0.002, n)))).round(2)
+    open_ = np.r_[close[0], close[:-1]]
+    oi = rng.integers(1_000_000, 5_000_000) + np.cumsum(rng.integers(-5_000, 5_000, n))
+    return {
+        "open": open_.tolist(),
+        "high": (np.maximum(open_, close) * 1.001).round(2).tolist(),
+        "low": (np.minimum(open_, close) * 0.999).round(2).tolist(),
+        "close": close.tolist(),
+        "volume": rng.integers(1_000, 100_000, n).tolist(),
+        "timestamp": ts.tolist(),
+        "open_interest": oi.clip(0).tolist(),
+    }
+
+
+def synthetic_daily(security_id, days=15):
+    rng = np.random.default_rng(_seed(security_id) + 1)
+    ts = [_epoch(d) for d in _trading_days(_today(), days)]
+    close = (rng.uniform(100, 3000) * np.exp(np.cumsum(rng.normal(0, 0.01, len(ts))))).round(2)
+    return {"close": close.tolist(), "timestamp": ts}
+
+
+def _since(from_date):
+    """fromDate ("YYYY-MM-DD" or "YYYY-MM-DD HH:MM:SS", IST) -> epoch seconds."""
+    fmt = "%Y-%m-%d %H:%M:%S" if " " in from_date else "%Y-%m-%d"
+    return _epoch(datetime.strptime(from_date, fmt))
+
+
+def _slice(data, since):
+    ts = data.get("timestamp") or []
+    keep = [i for i, t in enumerate(ts) if t >= since]
+    return {
+        k: [v[i] for i in keep] if isinstance(v, list) and len(v) == len(ts) else v
+        for k, v in data.items()
+    }
+
+
+def _shift_to_today(data):
+    """Move a recorded reply forward by whole days so it ends today."""
+    ts = data.get("timestamp") or []
+    if not ts:
+        return data
+    last_day = (ts[-1] + IST_OFFSET) // 86400
+    shift = (_epoch(_today()) + IST_OFFSET) // 86400 - last_day
+    shift *= 86400
+    return {**data, "timestamp": [t + shift for t in ts]}
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # the default (5) drops concurrent connects
+
+
+class StubDhan:
+    """
+    Local HTTP server speaking the three v2 endpoints the scanner uses.
+    Replies come from `recordings` (<endpoint>/<securityId>.json) when
+    present, else from the synthetic generators. With `record_to`, requests
+    are forwarded to the real API instead and the replies saved there.
+    """
+
+    def __init__(self, recordings=None, record_to=None, latency_ms=0.0):
+        self.recordings = recordings
+        self.record_to = record_to
+        self.latency = latency_ms / 1000.0
+        self.requests = 0
+        self.recorded_replies = 0
+        self.lock = threading.Lock()
+        self.server = _StubServer(("127.0.0.1", 0), self._handler())
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def _recorded(self, endpoint, security_id):
+        if not self.recordings:
+            return None
+        folder = endpoint.strip("/").replace("/", "_")
+        path = os.path.join(self.recordings, folder, f"{security_id}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            data = _shift_to_today(json.load(f))
+        with self.lock:
+            self.recorded_replies += 1
+        return data
+
+    def reply(self, endpoint, payload):
+        if endpoint == "/marketfeed/ltp":
+            return {
+                "status": "success",
+                "data": {
+                    seg: {
+                        str(sid): {"last_price": synthetic_daily(sid)["close"][-1]} for sid in ids
+                    }
+                    for seg, ids in payload.items()
+                },
+            }
+        sid = payload.get("securityId")
+        data = self._recorded(endpoint, sid)
+        if endpoint == "/charts/intraday":
+            data = data or synthetic_intraday(sid, int(payload.get("interval", 5)))
+            return _slice(data, _since(payload["fromDate"]))
+        if endpoint == "/charts/historical":
+            return data or synthetic_daily(sid)
+        return None
+
+    def forward(self, endpoint, body, headers):
+        import requests
+
+        resp = requests.post(f"{REAL_BASE}{endpoint}", data=body, headers=headers, timeout=10)
+        if resp.ok and endpoint != "/marketfeed/ltp":
+            sid = json.loads(body).get("securityId")
+            folder = os.path.join(self.record_to, endpoint.strip("/").replace("/", "_"))
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, f"{sid}.json"), "w") as f:
+                f.write(resp.text)
+        return resp.status_code, resp.content
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                endpoint = self.path.split("?")[0]
+                with stub.lock:
+                    stub.requests += 1
+                if stub.record_to:
+                    fwd = {
+                        k: v for k, v in self.headers.items() if k.lower() in FORWARD_HEADERS
+                    }
+                    status, out = stub.forward(endpoint, body, fwd)
+                else:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    data = stub.reply(endpoint, json.loads(body or b"{}"))
+                    status, out = 200, json.dumps(data).encode()
+                    if data is None:
+                        status, out = 404, b"{}"
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def bench_universe(master, as_of=None):
+    """
+    (fno_map, index_fut_map) as the scanner would build it on `as_of`
+    (default: the master's first FUTSTK expiry), so runs stay comparable
+    however old the committed master file is.
+    """
+    from fno_scanner.master import load_instrument_index
+
+    index = load_instrument_index(master)
+    if as_of is None:
+        as_of = min(
+            c.expiry for u in index.underlyings("FUTSTK") for c in index.contracts(u, "FUTSTK")
+        )
+    fno_map = {}
+    for under in index.underlyings("FUTSTK"):
+        c = index.nearest(under, "FUTSTK", as_of)
+        if c is not None:
+            fno_map[under] = {"id": c.security_id, "name": c.name}
+    index_fut_map = {}
+    for base in ("NIFTY", "BANKNIFTY", "SENSEX"):
+        c = index.nearest(base, "FUTIDX", as_of)
+        index_fut_map[base] = c.security_id if c is not None else None
+    return fno_map, index_fut_map
+
+
+def latency_stats(samples):
+    arr = np.asarray(samples, dtype=float) * 1000.0
+    if not len(arr):
+        return {"n": 0}
+    return {
+        "n": int(len(arr)),
+        "mean_ms": round(float(arr.mean()), 3),
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p99_ms": round(float(np.percentile(arr, 99)), 3),
+        "max_ms": round(float(arr.max()), 3),
+    }
+
+
+def dashboard_refresh(snapshot, index_quotes):
+    """
+    The data side of one dashboard + scanner fragment refresh: index
+    quotes / previous closes and the sorted bull / bear / all-data tables.
+    (Streamlit's own drawing is not included.)
+    """
+    import pandas as pd
+
+    ltps = index_quotes(ttl=0)
+    frames = [pd.DataFrame(snapshot["index_rows"])]
+    for key in ("bull", "bear"):
+        df = snapshot[key].head(20)
+        frames.append(df[[c for c in df.columns if c != "Sym"]])
+    df = snapshot["all_data"]
+    frames.append(df[[c for c in df.columns if c != "Sym"]])
+    return ltps, frames
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO,
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        base = json.load(f)
+    print(f"\nvs {baseline_path} ({base.get('commit')}):")
+    for name in ("scan_cold", "scan_warm", "symbol", "dashboard"):
+        old, new = base["results"].get(name, {}), current["results"].get(name, {})
+        for stat in ("p50_ms", "p99_ms"):
+            if stat in old and stat in new and old[stat]:
+                change = (new[stat] / old[stat] - 1) * 100
+                print(
+                    f"  {name:<10} {stat:<7} {old[stat]:>10.2f} -> {new[stat]:>10.2f}"
+                    f"  ({change:+.1f}%)"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--master", default=os.path.join(REPO, "dhan_master.csv"))
+    parser.add_argument("--as-of", help="universe date YYYY-MM-DD (default: first expiry)")
+    parser.add_argument("--recordings", help="directory of recorded replies to replay")
+    parser.add_argument("--record", metavar="DIR", help="proxy to the real API and save replies")
+    parser.add_argument("--scans", type=int, default=5, help="full scans (first one cold)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="stub reply delay")
+    parser.add_argument("--dhan-rate", type=float, help="keep a Dhan rate limit (requests/s)")
+    parser.add_argument("--out", help="result JSON path (default benchmarks/results/)")
+    parser.add_argument("--compare", help="earlier result JSON to diff against")
+    args = parser.parse_args()
+    if args.recordings and not os.path.isdir(args.recordings):
+        parser.error(f"--recordings: no such directory {args.recordings}")
+
+    stub = StubDhan(args.recordings, args.record, args.latency_ms).start()
+    # Before importing the scanner: its base URL and on-disk caches are
+    # module-level, so point them at the stub and a throwaway directory.
+    os.environ["DHAN_V2_BASE"] = stub.url
+    workdir = tempfile.mkdtemp(prefix="bench_scan_")
+    master = os.path.abspath(args.master)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO)
+
+    from fno_scanner import dhan
+    from fno_scanner.config import IST, load_credentials
+    from fno_scanner.metrics import HTTP_LATENCY, STAGE_LATENCY
+    from fno_scanner.pipeline import index_quotes, run_scan, scan_symbol
+
+    if args.record:
+        dhan.configure(*load_credentials(os.path.join(REPO, ".streamlit", "secrets.toml")))
+    else:
+        dhan.configure("bench", "bench")
+    for limiter in (dhan.DHAN_LIMITER, dhan.QUOTE_LIMITER):
+        rate = args.dhan_rate or 1e9
+        limiter.rate = limiter.capacity = limiter.tokens = float(rate)
+
+    as_of = datetime.strptime(args.as_of, "%Y-%m-%d").date() if args.as_of else None
+    universe = bench_universe(master, as_of)
+    fno_map = universe[0]
+    print(f"universe: {len(fno_map)} FUTSTK, stub {stub.url}, cache dir {workdir}")
+
+    scan_times = []
+    snapshot = None
+    for i in range(args.scans):
+        started = time.perf_counter()
+        snapshot = run_scan(datetime.now(IST), universe=universe, planner=None)
+        scan_times.append(time.perf_counter() - started)
+        print(
+            f"scan {i + 1}: {scan_times[-1]:.2f}s, {len(snapshot['all_data'])} rows, "
+            f"{len(snapshot['bull'])} bull / {len(snapshot['bear'])} bear"
+        )
+
+    now = datetime.now(IST)
+    scan_to = now.strftime("%Y-%m-%d")
+    scan_from = (now - timedelta(days=5)).strftime("%Y-%m-%d")
+    symbol_times = []
+    for info in fno_map.values():
+        started = time.perf_counter()
+        scan_symbol(info["id"], scan_from, scan_to, now.date())
+        symbol_times.append(time.perf_counter() - started)
+
+    dash_times = []
+    for _ in range(20):
+        started = time.perf_counter()
+        dashboard_refresh(snapshot, index_quotes)
+        dash_times.append(time.perf_counter() - started)
+    stub.stop()
+
+    total_symbol = sum(symbol_times)
+    warm = scan_times[1:] or scan_times
+    result = {
+        "commit": git_commit(),
+        "time": datetime.now(IST).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "source": "recorded" if stub.recorded_replies else "synthetic",
+        "symbols": len(fno_map),
+        "stub_requests": stub.requests,
+        "recorded_replies": stub.recorded_replies,
+        "results": {
+            "scan_cold": latency_stats(scan_times[:1]),
+            "scan_warm": latency_stats(scan_times[1:]),
+            "symbol": latency_stats(symbol_times),
+            "dashboard": latency_stats(dash_times),
+        },
+        "throughput": {
+            "scan_symbols_per_s": round(len(fno_map) / float(np.median(warm)), 1),
+            "symbol_per_s": round(len(symbol_times) / total_symbol, 1) if total_symbol else None,
+        },
+        "stages": STAGE_LATENCY.summary(),
+        "http": HTTP_LATENCY.summary(),
+    }
+
+    out = args.out or os.path.join(
+        REPO, "benchmarks", "results", f"bench_scan-{result['commit']}.json"
+    )
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=2, default=str)
+
+    print(f"\n{'':<10} {'n':>5} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, stats in result["results"].items():
+        if stats.get("n"):
+            print(f"{name:<10} {stats['n']:>5} {stats['p50_ms']:>10.2f} {stats['p99_ms']:>10.2f}")
+    print(f"throughput: {result['throughput']}")
+    print(f"saved {out}")
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
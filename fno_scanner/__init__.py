@@ -0,0 +1,19 @@
+"""
+Headless F&O scanner behind iTW's Live F&O Screener Pro.
+
+Run it as a long-lived service with `python -m fno_scanner scan`, or import
+`run_scan` / `ScanEngine` directly (the Streamlit app does the latter when no
+external snapshot is configured).
+"""
+from .config import load_credentials
+from .dhan import configure
+from .pipeline import ScanEngine, read_snapshot, run_scan, write_snapshot
+
+__all__ = [
+    "ScanEngine",
+    "configure",
+    "load_credentials",
+    "read_snapshot",
+    "run_scan",
+    "write_snapshot",
+]
@@ -0,0 +1,163 @@
+"""
+asyncio Dhan v2 client for the charts/intraday, charts/historical and
+marketfeed/ltp endpoints. One aiohttp session per event loop carries the
+auth headers; requests share the process-wide rate limiters with the
+blocking client in dhan.py, retry the same way and are cancelled on
+timeout, so a scan or dashboard refresh can issue all of its requests
+concurrently:
+
+    async with AsyncDhanClient() as client:
+        bars, quotes = await asyncio.gather(
+            client.intraday("52175", "FUTSTK", "2026-01-05", "2026-01-09", 5),
+            client.ltps("IDX_I", ["13", "25", "51"]),
+        )
+"""
+import asyncio
+import json
+import time
+
+import aiohttp
+
+from . import dhan
+from .config import ASYNC_CONCURRENCY, DHAN_V2_BASE
+from .dhan import (
+    DHAN_LIMITER,
+    HTTP_BACKOFF_SECONDS,
+    HTTP_RETRIES,
+    HTTP_TIMEOUT,
+    INFLIGHT,
+    QUOTE_LIMITER,
+    RETRY_STATUS,
+    daily_payload,
+    decode_intraday,
+    intraday_payload,
+    log_error,
+    ltp_payload,
+    ltps_from_reply,
+    prev_close_from_daily,
+    request_key,
+)
+from .metrics import HTTP_LATENCY, HTTP_RATE_LIMITED, HTTP_STATUS, stage
+
+
+class AsyncDhanClient:
+    """
+    Use as `async with AsyncDhanClient() as client:` inside one event loop.
+    At most `concurrency` requests are in flight; each attempt is cancelled
+    after `timeout` seconds.
+    """
+
+    def __init__(self, concurrency=ASYNC_CONCURRENCY, timeout=HTTP_TIMEOUT):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.session = None
+        self.slots = None
+
+    async def __aenter__(self):
+        headers = {"Accept": "application/json", "Content-Type": "application/json"}
+        headers.update(dhan.auth_headers())
+        self.session = aiohttp.ClientSession(
+            headers={k: v for k, v in headers.items() if v is not None},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+        )
+        self.slots = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def post(self, endpoint, payload, limiter=DHAN_LIMITER):
+        """
+        Async twin of dhan.dhan_post: decoded JSON (coalesced with identical
+        requests from any thread or loop), with the same retries (429 / 5xx
+        / connection errors / timeouts), backoff and metrics. Raises once
+        retries are exhausted.
+        """
+        return await INFLIGHT.do_async(
+            request_key(endpoint, payload), lambda: self._post(endpoint, payload, limiter)
+        )
+
+    async def _post(self, endpoint, payload, limiter):
+        async with self.slots:
+            for attempt in range(HTTP_RETRIES + 1):
+                delay = HTTP_BACKOFF_SECONDS * (2 ** attempt)
+                with stage("rate_limit_wait"):
+                    await limiter.acquire_async()
+                started = time.perf_counter()
+                try:
+                    async with self.session.post(
+                        f"{DHAN_V2_BASE}{endpoint}", json=payload
+                    ) as resp:
+                        status = resp.status
+                        retry_after = resp.headers.get("Retry-After", "")
+                        body = await resp.read()
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    HTTP_STATUS.inc(endpoint, "error")
+                    if attempt == HTTP_RETRIES:
+                        raise
+                    await asyncio.sleep(delay)
+                    continue
+                finally:
+                    HTTP_LATENCY.observe(endpoint, time.perf_counter() - started)
+
+                HTTP_STATUS.inc(endpoint, str(status))
+                if status == 429:
+                    HTTP_RATE_LIMITED.inc(endpoint)
+                if status in RETRY_STATUS and attempt < HTTP_RETRIES:
+                    await asyncio.sleep(float(retry_after) if retry_after.isdigit() else delay)
+                    continue
+                resp.raise_for_status()
+                with stage("json_decode"):
+                    return json.loads(body)
+
+    async def intraday(self, security_id, instrument, from_d, to_d, interval_min=60):
+        """Bars as dhan._post_intraday_v2 returns them; raises on errors."""
+        payload = intraday_payload(security_id, instrument, from_d, to_d, interval_min)
+        data = await self.post("/charts/intraday", payload)
+        with stage("decode"):
+            return decode_intraday(data)
+
+    async def prev_close(self, security_id, segment, instrument, days):
+        """Previous close from daily charts (0.0 if unavailable, errors logged)."""
+        try:
+            payload = daily_payload(security_id, segment, instrument, days)
+            return prev_close_from_daily(await self.post("/charts/historical", payload))
+        except Exception as e:
+            log_error(f"{instrument} daily v2 error ({security_id}): {e}", "prev_close")
+            return 0.0
+
+    async def ltps(self, segment, security_ids):
+        """{security_id: LTP} in one /marketfeed/ltp request (0.0 on failure)."""
+        ids = tuple(sorted(str(s) for s in security_ids))
+        try:
+            data = await self.post("/marketfeed/ltp", ltp_payload(segment, ids), QUOTE_LIMITER)
+            return ltps_from_reply(data, segment, ids)
+        except Exception as e:
+            log_error(f"LTP quote error ({segment}): {e}", "ltp")
+            return dict.fromkeys(ids, 0.0)
+
+
+async def gather_with_timeout(aws, timeout):
+    """
+    Run awaitables concurrently and return their results in order; an
+    exception is returned in place of a result. Whatever is still pending
+    after `timeout` seconds is cancelled and reported as asyncio.TimeoutError.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    if not tasks:
+        return []
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.wait(pending)
+    results = []
+    for task in tasks:
+        if task in pending:
+            results.append(asyncio.TimeoutError(f"cancelled after {timeout}s"))
+        elif task.exception() is not None:
+            results.append(task.exception())
+        else:
+            results.append(task.result())
+    return results
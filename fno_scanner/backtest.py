@@ -0,0 +1,417 @@
+"""
+Offline backtest of the conviction model: cached FUTSTK bars for the whole
+universe are loaded as one (symbol x time x field) panel, every bar is
+scored with the same indicator, OI-signal, entry and conviction rules as a
+live scan, and the forward returns of the flagged bars are reported by
+side and conviction bucket.
+
+    python -m fno_scanner backfill --days 90     # 5m bars -> tradefinder_history.db
+    python -m fno_scanner backtest --days 60
+
+Each bar is scored as of its close; a live scan also sees the forming bar.
+Indicators run over the whole stored history instead of the scanner's
+5-day window, and "Strength (min)" advances one bar at a time.
+"""
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .config import (
+    BACKFILL_CHUNK_DAYS,
+    BACKTEST_DB_PATH,
+    BACKTEST_HORIZONS,
+    BACKTEST_KEEP_DAYS,
+    BASE_INTERVAL_MIN,
+    CONVICTION_BUCKETS,
+    IST,
+    SCAN_INTERVAL_MIN,
+    SCAN_WORKERS,
+)
+from .dhan import _post_intraday_v2, log_error
+from .indicators import ADX_LEN, EMA_LEN, RSI_LEN
+from .scoring import CONVICTION_PARAMS, batch_conviction, batch_oi_signal, batch_signal_side
+from .stores import IST_OFFSET_SECONDS, BarStore, bucket_start
+
+
+class BarPanel:
+    """
+    Bars of many securities on one left-aligned grid: `data[s, j]` is the
+    j-th bar of security `ids[s]` (FIELDS order), `ts[s, j]` its epoch start.
+    Slots past `lengths[s]` are NaN / 0 padding.
+    """
+
+    FIELDS = ("open", "high", "low", "close", "volume", "oi")
+
+    def __init__(self, ids, ts, data, lengths, interval):
+        self.ids = list(ids)
+        self.ts = ts
+        self.data = data
+        self.lengths = lengths
+        self.interval = interval
+
+    def __len__(self):
+        return len(self.ids)
+
+    def field(self, name):
+        return self.data[:, :, self.FIELDS.index(name)]
+
+    def valid(self):
+        """(S, N) mask of real (non-padding) bars."""
+        return np.arange(self.data.shape[1]) < self.lengths[:, None]
+
+
+def load_panel(
+    db_path=BACKTEST_DB_PATH,
+    interval=SCAN_INTERVAL_MIN,
+    days=None,
+    security_ids=None,
+    base_min=BASE_INTERVAL_MIN,
+):
+    """
+    Every cached base_min bar in `db_path` (optionally only the last `days`
+    / `security_ids`), resampled to `interval` for all securities at once.
+    """
+    where = " WHERE interval = ?"
+    params = [int(base_min)]
+    if days:
+        where += " AND ts >= ?"
+        params.append(int((datetime.now(IST) - timedelta(days=days)).timestamp()))
+    conn = sqlite3.connect(db_path)
+    try:
+        if security_ids is None:
+            security_ids = [
+                r[0]
+                for r in conn.execute(
+                    "SELECT DISTINCT security_id FROM bars" + where + " ORDER BY security_id",
+                    params,
+                )
+            ]
+        # One query per security keeps every row numeric (no string column
+        # to carry through NumPy).
+        ids, chunks = [], []
+        for sid in security_ids:
+            rows = conn.execute(
+                "SELECT ts, open, high, low, close, volume, oi FROM bars"
+                + where
+                + " AND security_id = ? ORDER BY ts",
+                params + [str(sid)],
+            ).fetchall()
+            if rows:
+                ids.append(str(sid))
+                chunks.append(np.array(rows, dtype=np.float64))
+    finally:
+        conn.close()
+    if not chunks:
+        return BarPanel(
+            [],
+            np.zeros((0, 0), dtype=np.int64),
+            np.zeros((0, 0, len(BarPanel.FIELDS))),
+            np.zeros(0, dtype=int),
+            interval,
+        )
+
+    codes = np.repeat(np.arange(len(chunks)), [len(c) for c in chunks])
+    vals = np.concatenate(chunks)
+    ts = vals[:, 0].astype(np.int64)
+    vals = vals[:, 1:]
+
+    # One group per (security, interval bucket); rows are already sorted.
+    buckets = bucket_start(ts, interval) if interval != base_min else ts
+    starts = np.flatnonzero(
+        np.r_[True, (codes[1:] != codes[:-1]) | (buckets[1:] != buckets[:-1])]
+    )
+    ends = np.r_[starts[1:], len(ts)] - 1
+    bars = np.column_stack(
+        [
+            vals[starts, 0],
+            np.maximum.reduceat(vals[:, 1], starts),
+            np.minimum.reduceat(vals[:, 2], starts),
+            vals[ends, 3],
+            np.add.reduceat(vals[:, 4], starts),
+            vals[ends, 5],
+        ]
+    )
+
+    # Left-align every security's bars on a (S, N) grid.
+    group_codes = codes[starts]
+    lengths = np.bincount(group_codes, minlength=len(ids))
+    pos = np.arange(len(starts)) - np.r_[0, np.cumsum(lengths)[:-1]][group_codes]
+    data = np.full((len(ids), lengths.max(), len(BarPanel.FIELDS)), np.nan)
+    data[group_codes, pos] = bars
+    grid_ts = np.zeros((len(ids), lengths.max()), dtype=np.int64)
+    grid_ts[group_codes, pos] = buckets[starts]
+    return BarPanel(ids, grid_ts, data, lengths, interval)
+
+
+def _rma(frame, length):
+    # pandas_ta rma: ewm(alpha=1/length, adjust=True, min_periods=length)
+    return frame.ewm(alpha=1.0 / length, min_periods=length).mean()
+
+
+def panel_indicators(panel):
+    """
+    RSI(14), ADX(14) and EMA(5) for every bar of every security, as (S, N)
+    arrays; same values as IndicatorEngine / pandas_ta on each series.
+    """
+    # Time runs down the rows so pandas smooths every security at once.
+    high = pd.DataFrame(panel.field("high").T)
+    low = pd.DataFrame(panel.field("low").T)
+    close = pd.DataFrame(panel.field("close").T)
+    prev_close = close.shift(1)
+
+    diff = close - prev_close
+    avg_gain = _rma(diff.clip(lower=0), RSI_LEN)
+    avg_loss = _rma(diff.clip(upper=0), RSI_LEN)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = (avg_gain + avg_loss.abs()).to_numpy()
+        rsi = np.where(denom != 0, 100.0 * avg_gain.to_numpy() / denom, np.nan)
+
+        up = high - high.shift(1)
+        dn = low.shift(1) - low
+        pos = up.where((up > dn) & (up > 0), 0.0).where(up.notna())
+        neg = dn.where((dn > up) & (dn > 0), 0.0).where(up.notna())
+        tr = np.maximum(
+            np.maximum(high - low, (high - prev_close).abs()), (prev_close - low).abs()
+        )
+        atr = _rma(tr, ADX_LEN).to_numpy()
+        dmp = 100.0 * _rma(pos, ADX_LEN).to_numpy() / atr
+        dmn = 100.0 * _rma(neg, ADX_LEN).to_numpy() / atr
+        total = dmp + dmn
+        dx = np.where(
+            (atr == atr) & (atr != 0) & (total != 0),
+            100.0 * np.abs(dmp - dmn) / total,
+            np.nan,
+        )
+    adx = _rma(pd.DataFrame(dx), ADX_LEN).to_numpy()
+
+    # EMA seeded with the SMA of the first EMA_LEN closes (pandas_ta presma).
+    seeded = close.copy()
+    if len(seeded) >= EMA_LEN:
+        seeded.iloc[EMA_LEN - 1] = close.iloc[:EMA_LEN].mean(skipna=False)
+    seeded.iloc[: EMA_LEN - 1] = np.nan
+    ema = seeded.ewm(span=EMA_LEN, adjust=False).mean().to_numpy()
+    return rsi.T, adx.T, ema.T
+
+
+def panel_metrics(panel):
+    """
+    The per-symbol scan_symbol metrics for every bar: {name: (S, N) array}
+    with rsi, adx, mom, vol_ratio, p_chg, day_price_chg, oi_available,
+    oi_chg, plus `new_day` (first bar of a trading day).
+    """
+    n = panel.data.shape[1]
+    count = np.arange(1, n + 1)[None, :]  # bars seen so far, incl. this one
+    close = panel.field("close")
+    volume = panel.field("volume")
+    oi = panel.field("oi")
+
+    rsi, adx, ema = panel_indicators(panel)
+    warm = count >= RSI_LEN
+    rsi = np.where(warm, rsi, 0.0)
+    adx = np.where(warm, adx, 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mom = np.where(count >= EMA_LEN, np.round((close - ema) / ema * 100, 2), 0.0)
+
+        avg_vol = pd.DataFrame(volume.T).rolling(10).mean().to_numpy().T
+        vol_ratio = np.where((count > 10) & (avg_vol > 0), volume / avg_vol, 1.0)
+
+        prev = np.c_[np.full(len(panel), np.nan), close[:, :-1]]
+        p_chg = np.where(count > 1, np.round((close - prev) / prev * 100, 2), 0.0)
+
+        # Previous trading day's last close / this day's first OI, carried
+        # forward through the day.
+        day = (panel.ts + IST_OFFSET_SECONDS) // 86400
+        new_day = np.c_[np.ones((len(panel), 1), bool), day[:, 1:] != day[:, :-1]]
+        prev_close = pd.DataFrame(np.where(new_day, prev, np.nan).T).ffill().to_numpy().T
+        day_price_chg = np.where(
+            prev_close > 0, np.round((close - prev_close) / prev_close * 100, 2), 0.0
+        )
+
+        oi_available = np.fmax.accumulate(np.nan_to_num(oi), axis=1) > 0
+        day_start = pd.DataFrame(np.where(new_day, count, np.nan).T).ffill().to_numpy().T
+        day_oi = pd.DataFrame(np.where(new_day, oi, np.nan).T).ffill().to_numpy().T
+        oi_chg = np.where(
+            oi_available & (count - day_start >= 1) & (day_oi > 0),
+            np.round((oi - day_oi) / day_oi * 100, 2),
+            0.0,
+        )
+
+    return {
+        "rsi": rsi,
+        "adx": adx,
+        "mom": mom,
+        "vol_ratio": vol_ratio,
+        "p_chg": p_chg,
+        "day_price_chg": day_price_chg,
+        "oi_available": oi_available,
+        "oi_chg": oi_chg,
+        "new_day": new_day,
+    }
+
+
+def signal_strength(ts, side, new_day):
+    """
+    Minutes each bar's signal has been running (0 when unflagged): a run
+    starts when the side changes or a new trading day begins, like
+    SignalHistoryStore. All arguments are (S, N) panel arrays.
+    """
+    code = np.select([side == "bull", side == "bear"], [1, -1], default=0)
+    strength = np.zeros(code.shape)
+    start = ts[:, 0].copy()
+    prev = np.zeros(len(code), dtype=int)
+    for j in range(code.shape[1]):
+        restart = (code[:, j] != prev) | new_day[:, j]
+        start = np.where(restart, ts[:, j], start)
+        strength[:, j] = np.where(code[:, j] != 0, (ts[:, j] - start) / 60.0, 0.0)
+        prev = code[:, j]
+    return np.round(strength, 1)
+
+
+def score_panel(panel, metrics, params=CONVICTION_PARAMS):
+    """
+    Entry side, strength and conviction for every bar (all (S, N) arrays;
+    side is "" and conviction 0 for unflagged or padding slots), scored with
+    the batch thresholds in `params`.
+    """
+    valid = panel.valid()
+    flat = {k: v[valid] for k, v in metrics.items()}
+    oi_signal = batch_oi_signal(
+        flat["oi_chg"], flat["day_price_chg"], flat["oi_available"], params
+    )
+    side = np.full(valid.shape, "", dtype=object)
+    side[valid] = batch_signal_side(
+        flat["rsi"],
+        flat["vol_ratio"],
+        flat["oi_available"],
+        oi_signal,
+        flat["day_price_chg"],
+        flat["p_chg"],
+    )
+    strength = signal_strength(panel.ts, side, metrics["new_day"])
+
+    conv = np.zeros(valid.shape, dtype=int)
+    conv[valid] = batch_conviction(
+        side[valid],
+        flat["rsi"],
+        flat["adx"],
+        flat["mom"],
+        flat["vol_ratio"],
+        flat["oi_chg"],
+        oi_signal,
+        strength[valid],
+        flat["day_price_chg"],
+        flat["p_chg"],
+        params,
+    )[0]
+    conv[side == ""] = 0
+    return {"side": side, "strength": strength, "conviction": conv}
+
+
+def forward_returns(panel, horizons=BACKTEST_HORIZONS):
+    """{h: (S, N) % close-to-close return h bars ahead} (NaN past the end)."""
+    close = panel.field("close")
+    out = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for h in horizons:
+            ahead = np.full(close.shape, np.nan)
+            if h < close.shape[1]:
+                ahead[:, :-h] = close[:, h:]
+            out[h] = (ahead / close - 1.0) * 100
+    return out
+
+
+def conviction_report(panel, scored, returns, buckets=CONVICTION_BUCKETS):
+    """
+    Forward returns of flagged bars by side and conviction bucket: signal
+    count, mean return and hit rate per horizon, signed so that a bear
+    signal followed by a fall counts as a gain.
+    """
+    flagged = scored["side"] != ""
+    side = scored["side"][flagged]
+    sign = np.where(side == "bull", 1.0, -1.0)
+    df = pd.DataFrame(
+        {
+            "side": side,
+            "bucket": pd.cut(scored["conviction"][flagged], list(buckets), right=False),
+        }
+    )
+    aggs = {"Signals": ("side", "size")}
+    for h, ret in returns.items():
+        r = ret[flagged] * sign
+        df[f"ret_{h}"] = r
+        df[f"hit_{h}"] = np.where(np.isnan(r), np.nan, r > 0)
+        aggs[f"Ret {h}b %"] = (f"ret_{h}", "mean")
+        aggs[f"Hit {h}b %"] = (f"hit_{h}", "mean")
+    report = df.groupby(["side", "bucket"], observed=True).agg(**aggs)
+    for h in returns:
+        report[f"Hit {h}b %"] *= 100
+    return report.round(2)
+
+
+def run_backtest(
+    db_path=BACKTEST_DB_PATH,
+    interval=SCAN_INTERVAL_MIN,
+    days=None,
+    horizons=BACKTEST_HORIZONS,
+    buckets=CONVICTION_BUCKETS,
+):
+    """Load, score and report in one go: (report DataFrame, panel)."""
+    panel = load_panel(db_path, interval, days)
+    if not len(panel):
+        return pd.DataFrame(), panel
+    scored = score_panel(panel, panel_metrics(panel))
+    return conviction_report(panel, scored, forward_returns(panel, horizons), buckets), panel
+
+
+def _backfill_one(store, security_id, start, end, chunk_days):
+    bars = 0
+    while start <= end:
+        stop = min(end, start + timedelta(days=chunk_days - 1))
+        df = _post_intraday_v2(
+            security_id,
+            "FUTSTK",
+            start.strftime("%Y-%m-%d"),
+            stop.strftime("%Y-%m-%d"),
+            BASE_INTERVAL_MIN,
+        )
+        store.write(security_id, BASE_INTERVAL_MIN, df)
+        bars += len(df)
+        start = stop + timedelta(days=1)
+    return bars
+
+
+def backfill(
+    security_ids,
+    days,
+    db_path=BACKTEST_DB_PATH,
+    chunk_days=BACKFILL_CHUNK_DAYS,
+    on_progress=None,
+):
+    """
+    Fetch the last `days` of BASE_INTERVAL_MIN bars for every security into
+    the long-retention bar store, chunk_days per request. Returns the number
+    of bars written; failed securities are logged and skipped.
+    """
+    store = BarStore(db_path, keep_days=BACKTEST_KEEP_DAYS)
+    end = datetime.now(IST).date()
+    start = end - timedelta(days=days)
+    total = 0
+    done = 0
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+        futures = {
+            pool.submit(_backfill_one, store, sid, start, end, chunk_days): sid
+            for sid in security_ids
+        }
+        for fut in as_completed(futures):
+            done += 1
+            try:
+                total += fut.result()
+            except Exception as e:
+                log_error(f"Backfill error ({futures[fut]}): {e}", "backfill")
+            if on_progress:
+                on_progress(done / len(futures))
+    return total
@@ -0,0 +1,288 @@
+"""
+Command line entry point:
+
+    python -m fno_scanner scan --interval 60 --out snapshot.parquet
+    python -m fno_scanner compile-master --master dhan_master.csv
+    python -m fno_scanner scan --feed dhan --interval 5   # streaming mode
+    python -m fno_scanner mock-feed --port 8765
+    python -m fno_scanner backfill --days 90
+    python -m fno_scanner backtest --days 60
+    python -m fno_scanner optimize --search random --samples 300
+"""
+import argparse
+import logging
+import time
+from datetime import datetime
+
+from .config import (
+    BACKTEST_DB_PATH,
+    BACKTEST_HORIZONS,
+    HISTORY_DIR,
+    IST,
+    MASTER_CSV_PATH,
+    MIN_SCAN_GAP_SECONDS,
+    OPTIMIZE_HORIZON,
+    OPTIMIZE_MIN_CONVICTION,
+    SCAN_INTERVAL_MIN,
+    SNAPSHOT_PATH,
+    load_credentials,
+)
+from .dhan import configure
+from .history import ScanHistoryWriter
+from .market import MARKET
+from .master import compile_master, get_universe, index_path_for
+from .metrics import HTTP_LATENCY, SCANS, STAGE_LATENCY, serve_metrics
+from .planner import PLANNER
+from .stores import fetch_bars_incremental
+from .pipeline import run_scan, write_snapshot
+
+logger = logging.getLogger("fno_scanner")
+
+CLOSED_RECHECK_SECONDS = 600  # re-read the clock at least this often while closed
+
+
+def cmd_scan(args):
+    configure(*load_credentials())
+    fetch = fetch_bars_incremental
+    planner = PLANNER
+    feed = None
+    if args.feed:
+        from .feed import LiveFeed, feed_url
+
+        feed = LiveFeed(feed_url(args.feed)).start()
+        fetch = feed.bars
+        planner = None  # bars come from memory: refresh everything every sweep
+    history = None if args.no_history else ScanHistoryWriter(args.history)
+    if args.metrics_port:
+        serve_metrics(args.metrics_port)
+        logger.info("metrics on http://0.0.0.0:%d/metrics", args.metrics_port)
+    first = True
+    while True:
+        wait = 0.0 if args.ignore_calendar else MARKET.seconds_until_active()
+        if wait and not first:
+            # Closed: the last snapshot stays valid until the next warm-up.
+            logger.info("market closed, next sweep in %.0f min", wait / 60)
+            time.sleep(min(wait, CLOSED_RECHECK_SECONDS))
+            continue
+        first = False
+        started = time.monotonic()
+        try:
+            universe = get_universe(args.master)
+            snapshot = run_scan(
+                datetime.now(IST), universe=universe, fetch=fetch, planner=planner
+            )
+            write_snapshot(snapshot, args.out)
+            if history is not None:
+                history.append(snapshot)
+            logger.info(
+                "scan done in %.1fs: %d symbols, %d bull, %d bear -> %s",
+                time.monotonic() - started,
+                len(snapshot["all_data"]),
+                len(snapshot["bull"]),
+                len(snapshot["bear"]),
+                args.out,
+            )
+            logger.debug("http latency: %s", HTTP_LATENCY.summary())
+            logger.debug("stage timings: %s", STAGE_LATENCY.summary())
+            if feed is not None:
+                logger.debug("live feed: %s", feed.status())
+        except Exception:
+            SCANS.inc("failed")
+            logger.exception("scan failed")
+            if args.once:
+                return 1
+        if args.once:
+            if history is not None:
+                history.flush()
+            return 0
+        time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+
+
+def cmd_compile_master(args):
+    started = time.monotonic()
+    index = compile_master(args.master)
+    logger.info(
+        "compiled %d contracts in %.2fs -> %s",
+        len(index),
+        time.monotonic() - started,
+        index_path_for(args.master),
+    )
+    return 0
+
+
+def cmd_mock_feed(args):
+    from .mockfeed import MockFeedServer
+
+    MockFeedServer(args.host, args.port, args.tick).run()
+    return 0
+
+
+def cmd_backfill(args):
+    from .backtest import backfill
+
+    configure(*load_credentials())
+    fno_map, _ = get_universe(args.master)
+    started = time.monotonic()
+    bars = backfill([info["id"] for info in fno_map.values()], args.days, args.db)
+    logger.info(
+        "backfilled %d bars for %d contracts in %.1fs -> %s",
+        bars,
+        len(fno_map),
+        time.monotonic() - started,
+        args.db,
+    )
+    return 0
+
+
+def cmd_backtest(args):
+    import pandas as pd
+
+    from .backtest import run_backtest
+
+    started = time.monotonic()
+    report, panel = run_backtest(args.db, args.interval, args.days, tuple(args.horizons))
+    if not len(panel):
+        logger.error("no cached bars in %s (run `backfill` first)", args.db)
+        return 1
+    with pd.option_context("display.width", 200, "display.max_rows", None):
+        print(report)
+    logger.info(
+        "backtested %d contracts x %d bars in %.2fs",
+        len(panel),
+        int(panel.lengths.sum()),
+        time.monotonic() - started,
+    )
+    return 0
+
+
+def cmd_optimize(args):
+    import pandas as pd
+
+    from .backtest import load_panel
+    from .optimize import grid_param_sets, random_param_sets, sweep
+
+    started = time.monotonic()
+    panel = load_panel(args.db, args.interval, args.days)
+    if not len(panel):
+        logger.error("no cached bars in %s (run `backfill` first)", args.db)
+        return 1
+    if args.search == "grid":
+        param_sets = grid_param_sets()
+    else:
+        param_sets = random_param_sets(args.samples, seed=args.seed)
+    ranked = sweep(
+        panel, param_sets, args.horizon, args.min_conviction, workers=args.workers
+    )
+    if args.out:
+        ranked.to_csv(args.out, index=False)
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(ranked.head(args.top))
+    logger.info(
+        "scored %d parameter sets on %d contracts in %.1fs",
+        len(param_sets),
+        len(panel),
+        time.monotonic() - started,
+    )
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="fno_scanner")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    scan = sub.add_parser("scan", help="run the scanner and publish snapshots")
+    scan.add_argument(
+        "--interval",
+        type=float,
+        default=MIN_SCAN_GAP_SECONDS,
+        help="seconds between the starts of two sweeps",
+    )
+    scan.add_argument("--out", default=SNAPSHOT_PATH, help="snapshot Parquet path")
+    scan.add_argument("--master", default=MASTER_CSV_PATH, help="dhan_master.csv path")
+    scan.add_argument("--once", action="store_true", help="run a single sweep and exit")
+    scan.add_argument("--history", default=HISTORY_DIR, help="scan history directory")
+    scan.add_argument("--no-history", action="store_true", help="do not keep scan history")
+    scan.add_argument(
+        "--ignore-calendar",
+        action="store_true",
+        help="keep sweeping outside NSE trading sessions",
+    )
+    scan.add_argument(
+        "--feed",
+        metavar="URL",
+        help='stream ticks from the Dhan market feed ("dhan") or a ws:// URL',
+    )
+    scan.add_argument(
+        "--metrics-port",
+        type=int,
+        metavar="PORT",
+        help="serve Prometheus text metrics on this port (/metrics)",
+    )
+    scan.add_argument("-v", "--verbose", action="store_true", help="debug logging")
+    scan.set_defaults(func=cmd_scan)
+
+    compile_ = sub.add_parser(
+        "compile-master", help="rebuild the compiled instrument index from the master CSV"
+    )
+    compile_.add_argument("--master", default=MASTER_CSV_PATH, help="dhan_master.csv path")
+    compile_.set_defaults(func=cmd_compile_master)
+
+    mock = sub.add_parser("mock-feed", help="serve a fake Dhan market feed for testing")
+    mock.add_argument("--host", default="127.0.0.1")
+    mock.add_argument("--port", type=int, default=8765)
+    mock.add_argument("--tick", type=float, default=0.5, help="seconds between ticks")
+    mock.set_defaults(func=cmd_mock_feed)
+
+    fill = sub.add_parser("backfill", help="store months of FUTSTK bars for backtesting")
+    fill.add_argument("--days", type=int, default=90, help="calendar days of history")
+    fill.add_argument("--db", default=BACKTEST_DB_PATH, help="bar store to fill")
+    fill.add_argument("--master", default=MASTER_CSV_PATH, help="dhan_master.csv path")
+    fill.set_defaults(func=cmd_backfill)
+
+    bt = sub.add_parser("backtest", help="replay cached bars through the conviction model")
+    bt.add_argument("--db", default=BACKTEST_DB_PATH, help="bar store to read")
+    bt.add_argument("--days", type=int, help="only the last N calendar days")
+    bt.add_argument(
+        "--interval", type=int, default=SCAN_INTERVAL_MIN, help="bar size scored (minutes)"
+    )
+    bt.add_argument(
+        "--horizons",
+        type=int,
+        nargs="+",
+        default=list(BACKTEST_HORIZONS),
+        help="forward-return horizons in bars",
+    )
+    bt.set_defaults(func=cmd_backtest)
+
+    opt = sub.add_parser("optimize", help="search conviction thresholds on cached bars")
+    opt.add_argument("--db", default=BACKTEST_DB_PATH, help="bar store to read")
+    opt.add_argument("--days", type=int, help="only the last N calendar days")
+    opt.add_argument(
+        "--interval", type=int, default=SCAN_INTERVAL_MIN, help="bar size scored (minutes)"
+    )
+    opt.add_argument("--search", choices=("grid", "random"), default="random")
+    opt.add_argument("--samples", type=int, default=200, help="random search: parameter sets")
+    opt.add_argument("--seed", type=int, help="random search seed")
+    opt.add_argument(
+        "--horizon", type=int, default=OPTIMIZE_HORIZON, help="forward-return horizon in bars"
+    )
+    opt.add_argument(
+        "--min-conviction",
+        type=int,
+        default=OPTIMIZE_MIN_CONVICTION,
+        help="only score signals at or above this conviction",
+    )
+    opt.add_argument("--workers", type=int, help="processes (default: all CPUs)")
+    opt.add_argument("--top", type=int, default=20, help="rows to print")
+    opt.add_argument("--out", help="write the full ranking to this CSV")
+    opt.set_defaults(func=cmd_optimize)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if getattr(args, "verbose", False) else logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+    return args.func(args)
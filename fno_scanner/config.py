@@ -0,0 +1,77 @@
+"""
+Constants and credentials shared by the headless scanner and the Streamlit app.
+"""
+import os
+import tomllib
+
+import pytz
+
+IST = pytz.timezone("Asia/Kolkata")  # Force IST Timezone
+
+MIN_SCAN_GAP_SECONDS = 30  # wait at least 30s between full scans
+MAX_SYMBOL_GAP_SECONDS = 300  # quiet symbols back off to at most one refresh per 5 min
+HOT_MOVE_PCT = 0.15  # price move (%) since the last refresh that keeps a symbol hot
+HOT_OI_MOVE_PCT = 1.0  # change in intraday OI Chg% that keeps a symbol hot
+HOT_TIER_MAX = 40  # current bull/bear names (by conviction) refreshed every sweep
+TAIL_ROTATION_SWEEPS = 6  # the rest: at most 1/6 of them per sweep, most overdue first
+FULL_REFRESH_EVERY_MIN = 15  # refresh everything after each 15m candle close ...
+CANDLE_SETTLE_SECONDS = 5  # ... this long after it, once Dhan has the bar
+FEED_SCAN_GAP_SECONDS = 5  # streaming mode: sweeps read memory, so run them often
+DHAN_DATA_RATE_PER_SEC = 10  # Dhan data-API quota per access token (requests / second)
+SCAN_WORKERS = 8  # parallel FUTSTK fetches per scan
+ASYNC_FETCH = True  # fetch each scan's REST requests concurrently in one asyncio loop
+ASYNC_CONCURRENCY = 16  # requests in flight at once (still paced by the rate limits)
+ASYNC_FETCH_TIMEOUT_SECONDS = 60  # cancel what a scan's fetch phase hasn't finished by then
+QUOTE_RATE_PER_SEC = 1  # Dhan market-quote API quota (requests / second)
+QUOTE_TTL_SECONDS = 1.0  # LTP replies shared by all callers for this long
+COALESCE_TTL_SECONDS = 1.0  # identical Dhan requests this close together share one reply
+MARKET_CALENDAR = "XNSE"  # pandas_market_calendars name for NSE sessions / holidays
+WARMUP_MINUTES = 10  # start sweeping this long before 09:15 to fill the caches
+POST_CLOSE_GRACE_MINUTES = 5  # keep sweeping briefly after close for the final bars
+CLOSED_REFRESH_SECONDS = 900  # dashboard LTP refresh while the market is closed
+BASE_INTERVAL_MIN = 5  # the only bar size fetched; coarser ones are resampled from it
+SCAN_INTERVAL_MIN = 60  # timeframe the signals / conviction are scored on
+CONFIRM_INTERVALS = (15,)  # extra timeframes shown side by side as confirmation
+CACHE_DB_PATH = "tradefinder_cache.db"  # local on-disk cache shared by all sessions
+MASTER_CSV_PATH = "dhan_master.csv"
+SNAPSHOT_PATH = "snapshot.parquet"  # default output of `python -m fno_scanner scan`
+HISTORY_DIR = "scan_history"  # every scan, Parquet partitioned by date / table
+HISTORY_FLUSH_SCANS = 10  # write a history batch every 10 scans ...
+HISTORY_FLUSH_SECONDS = 300  # ... or 5 min, whichever comes first
+HISTORY_KEEP_DAYS = 60
+BACKTEST_DB_PATH = "tradefinder_history.db"  # long-retention 5m bars (`backfill`) for `backtest`
+BACKTEST_KEEP_DAYS = 400
+BACKFILL_CHUNK_DAYS = 90  # Dhan intraday charts serve at most 90 days per request
+BACKTEST_HORIZONS = (1, 3, 7)  # forward-return horizons, in SCAN_INTERVAL_MIN bars
+CONVICTION_BUCKETS = (0, 40, 55, 70, 85, 101)  # backtest report bins: [lo, hi)
+OPTIMIZE_HORIZON = 3  # threshold search scores returns this many bars ahead ...
+OPTIMIZE_MIN_CONVICTION = 55  # ... of signals at or above this conviction
+OPTIMIZE_MIN_SIGNALS = 30  # fewer signals than this: ranked last
+SECRETS_PATH = os.path.join(".streamlit", "secrets.toml")
+
+# v2 REST base URL (override to point the scanner at a local stub, see benchmarks/)
+DHAN_V2_BASE = os.environ.get("DHAN_V2_BASE", "https://api.dhan.co/v2")
+
+# Spot indices
+INDEX_MAP = {
+    "NIFTY": {"id": "13", "name": "NIFTY 50"},
+    "BANKNIFTY": {"id": "25", "name": "BANK NIFTY"},
+    "SENSEX": {"id": "51", "name": "SENSEX"},
+}
+
+
+def load_credentials(secrets_path=SECRETS_PATH):
+    """
+    (client_id, access_token) from DHAN_CLIENT_ID / DHAN_ACCESS_TOKEN env vars,
+    falling back to the Streamlit secrets file. Raises KeyError if missing.
+    """
+    client_id = os.environ.get("DHAN_CLIENT_ID")
+    access_token = os.environ.get("DHAN_ACCESS_TOKEN")
+    if (not client_id or not access_token) and os.path.exists(secrets_path):
+        with open(secrets_path, "rb") as f:
+            secrets = tomllib.load(f)
+        client_id = client_id or secrets.get("DHAN_CLIENT_ID")
+        access_token = access_token or secrets.get("DHAN_ACCESS_TOKEN")
+    if not client_id or not access_token:
+        raise KeyError("DHAN_CLIENT_ID / DHAN_ACCESS_TOKEN not configured")
+    return str(client_id), str(access_token)
@@ -0,0 +1,433 @@
+"""
+Dhan REST access: client setup, process-wide rate limiting and the raw
+v2 intraday / daily calls (blocking; aiodhan has the asyncio client).
+Nothing here touches Streamlit.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import (
+    COALESCE_TTL_SECONDS,
+    DHAN_DATA_RATE_PER_SEC,
+    DHAN_V2_BASE,
+    IST,
+    QUOTE_RATE_PER_SEC,
+    QUOTE_TTL_SECONDS,
+    SCAN_WORKERS,
+)
+from .metrics import (
+    ERRORS,
+    HTTP_COALESCED,
+    HTTP_LATENCY,
+    HTTP_RATE_LIMITED,
+    HTTP_STATUS,
+    stage,
+)
+
+logger = logging.getLogger("fno_scanner")
+
+CLIENT_ID = None
+ACCESS_TOKEN = None  # used for v1 & v2
+
+HTTP_TIMEOUT = 5
+HTTP_RETRIES = 3  # extra attempts on 429 / 5xx / connection errors
+HTTP_BACKOFF_SECONDS = 0.5  # doubled after every failed attempt
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def _build_session():
+    # Keep-alive pool big enough for every scan worker plus the dashboard.
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=SCAN_WORKERS + 4)
+    session.mount("https://", adapter)
+    session.headers.update(
+        {"Accept": "application/json", "Content-Type": "application/json"}
+    )
+    return session
+
+
+SESSION = _build_session()
+
+
+def configure(client_id, access_token):
+    """Set the credentials every call in this package uses; returns SESSION."""
+    global CLIENT_ID, ACCESS_TOKEN
+    CLIENT_ID = str(client_id)
+    ACCESS_TOKEN = access_token
+    SESSION.headers.update(auth_headers())
+    return SESSION
+
+
+def auth_headers():
+    """Headers every v2 request carries (client-id is required by /marketfeed)."""
+    return {"access-token": ACCESS_TOKEN, "client-id": CLIENT_ID}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `acquire()` blocks (`acquire_async()` awaits)
+    until a token is free, so threads and event loops together never exceed
+    `rate` requests per second (bursts up to `capacity`).
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _take(self):
+        # Take a token: 0 on success, else the seconds until one is due.
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        wait = self._take()
+        while wait:
+            time.sleep(wait)
+            wait = self._take()
+
+    async def acquire_async(self):
+        wait = self._take()
+        while wait:
+            await asyncio.sleep(wait)
+            wait = self._take()
+
+
+# One bucket per process: every session shares the same Dhan token/quota.
+DHAN_LIMITER = TokenBucket(DHAN_DATA_RATE_PER_SEC)
+QUOTE_LIMITER = TokenBucket(QUOTE_RATE_PER_SEC)  # /marketfeed has its own quota
+
+
+class SingleFlight:
+    """
+    Request coalescing for threads and event loops alike: callers asking
+    for a key that is already in flight wait for that call's result (or
+    exception) instead of repeating it, and a result is reused for `ttl`
+    seconds after it lands. Failures are never reused. `on_shared(key)` is
+    called for every caller served without a call of its own.
+    """
+
+    def __init__(self, ttl, on_shared=None):
+        self.ttl = ttl
+        self.on_shared = on_shared
+        self.lock = threading.Lock()
+        self.inflight = {}  # key -> concurrent.futures.Future of the running call
+        self.recent = {}  # key -> (finished_at, result)
+
+    def _join(self, key):
+        # (future, True if this caller has to make the call itself)
+        with self.lock:
+            hit = self.recent.get(key)
+            if hit and time.monotonic() - hit[0] < self.ttl:
+                fut = Future()
+                fut.set_result(hit[1])
+            else:
+                fut = self.inflight.get(key)
+            if fut is None:
+                fut = self.inflight[key] = Future()
+                # Running futures cannot be cancelled, so a cancelled waiter
+                # (asyncio.wrap_future) never cancels the shared call.
+                fut.set_running_or_notify_cancel()
+                return fut, True
+        if self.on_shared:
+            self.on_shared(key)
+        return fut, False
+
+    def _finish(self, key, fut, result=None, error=None):
+        with self.lock:
+            del self.inflight[key]
+            now = time.monotonic()
+            self.recent = {k: v for k, v in self.recent.items() if now - v[0] < self.ttl}
+            if error is None:
+                self.recent[key] = (now, result)
+        if error is None:
+            fut.set_result(result)
+        else:
+            fut.set_exception(error)
+
+    def do(self, key, fn):
+        """fn() once for every concurrent caller of `key` (blocking)."""
+        fut, leader = self._join(key)
+        if not leader:
+            return fut.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, fut, error=e)
+            raise
+        self._finish(key, fut, result)
+        return result
+
+    async def do_async(self, key, fn):
+        """`await fn()` once for every concurrent caller of `key`."""
+        fut, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(fut)
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # Waiters in other threads / loops were not cancelled themselves.
+            self._finish(key, fut, error=asyncio.TimeoutError("shared request was cancelled"))
+            raise
+        except BaseException as e:
+            self._finish(key, fut, error=e)
+            raise
+        self._finish(key, fut, result)
+        return result
+
+
+# Shared by dhan_post and the asyncio client: one reply per distinct request.
+INFLIGHT = SingleFlight(COALESCE_TTL_SECONDS, on_shared=lambda key: HTTP_COALESCED.inc(key[0]))
+
+
+def request_key(endpoint, payload):
+    """(endpoint, canonical payload): security, segment, date range, interval."""
+    return endpoint, json.dumps(payload, sort_keys=True)
+
+
+def dhan_post(endpoint, payload, limiter=DHAN_LIMITER):
+    """
+    POST `payload` to a v2 endpoint (e.g. "/charts/intraday") on the pooled
+    session and return the decoded JSON (shared with identical concurrent
+    or just-finished requests, see SingleFlight: treat it as read-only).
+    Every attempt takes a `limiter` token; 429 / 5xx / connection errors
+    are retried with exponential backoff (honouring Retry-After). Raises
+    once retries are exhausted.
+    """
+    return INFLIGHT.do(request_key(endpoint, payload), lambda: _post(endpoint, payload, limiter))
+
+
+def _post(endpoint, payload, limiter):
+    body = json.dumps(payload)
+    for attempt in range(HTTP_RETRIES + 1):
+        delay = HTTP_BACKOFF_SECONDS * (2 ** attempt)
+        with stage("rate_limit_wait"):
+            limiter.acquire()
+        started = time.perf_counter()
+        try:
+            resp = SESSION.post(f"{DHAN_V2_BASE}{endpoint}", data=body, timeout=HTTP_TIMEOUT)
+        except (requests.ConnectionError, requests.Timeout):
+            HTTP_STATUS.inc(endpoint, "error")
+            if attempt == HTTP_RETRIES:
+                raise
+            time.sleep(delay)
+            continue
+        finally:
+            HTTP_LATENCY.observe(endpoint, time.perf_counter() - started)
+
+        HTTP_STATUS.inc(endpoint, str(resp.status_code))
+        if resp.status_code == 429:
+            HTTP_RATE_LIMITED.inc(endpoint)
+        if resp.status_code in RETRY_STATUS and attempt < HTTP_RETRIES:
+            retry_after = resp.headers.get("Retry-After", "")
+            time.sleep(float(retry_after) if retry_after.isdigit() else delay)
+            continue
+        resp.raise_for_status()
+        with stage("json_decode"):
+            return resp.json()
+
+
+# Recent API / scan errors from any thread, shown in the app's debug panel.
+ERROR_LOG = deque(maxlen=50)
+
+
+def log_error(msg, kind="other"):
+    """Log, count under ERRORS[kind] and keep for the debug panel."""
+    ERRORS.inc(kind)
+    logger.warning(msg)
+    ERROR_LOG.append(f"{datetime.now(IST).strftime('%H:%M:%S')} {msg}")
+
+
+# Previous-close lookups: (segment, instrument, days of daily history).
+PREV_CLOSE_INDEX = ("IDX_I", "INDEX", 20)
+PREV_CLOSE_FUTSTK = ("NSE_FNO", "FUTSTK", 10)
+
+
+def daily_payload(security_id, segment, instrument, days):
+    """v2 /charts/historical request for the last `days` calendar days."""
+    now = datetime.now(IST)
+    return {
+        "securityId": str(security_id),
+        "exchangeSegment": segment,
+        "instrument": instrument,
+        "expiryCode": 0,
+        "oi": False,
+        "fromDate": (now - timedelta(days=days)).strftime("%Y-%m-%d"),
+        "toDate": now.strftime("%Y-%m-%d"),
+    }
+
+
+def prev_close_from_daily(data):
+    """Last close before today in a v2 daily chart reply (0.0 if none). [web:42]"""
+    closes = data.get("close", [])
+    ts = data.get("timestamp", [])
+    if not closes or not ts:
+        return 0.0
+
+    n = min(len(closes), len(ts))
+    dates = epoch_to_ist(_column(ts, n, np.int64)).date
+    past = np.flatnonzero(dates < datetime.now(IST).date())
+    if not len(past):
+        return 0.0
+    return float(closes[past[-1]])
+
+
+def _fetch_prev_close(security_id, segment, instrument, days):
+    """Previous close from v2 daily historical charts (0.0 if unavailable)."""
+    try:
+        payload = daily_payload(security_id, segment, instrument, days)
+        return prev_close_from_daily(dhan_post("/charts/historical", payload))
+    except Exception as e:
+        log_error(f"{instrument} daily v2 error ({security_id}): {e}", "prev_close")
+        return 0.0
+
+
+def _fetch_prev_close_index(security_id):
+    return _fetch_prev_close(security_id, *PREV_CLOSE_INDEX)
+
+
+def _fetch_prev_close_futstk(security_id):
+    return _fetch_prev_close(security_id, *PREV_CLOSE_FUTSTK)
+
+
+_ltp_lock = threading.Lock()
+_ltp_cache = {}  # (segment, ids) -> (fetched_at, {security_id: ltp})
+
+
+def get_ltps(segment, security_ids, ttl=QUOTE_TTL_SECONDS):
+    """
+    {security_id: last traded price} for all ids in one v2 /marketfeed/ltp
+    request. Replies are shared by every caller in the process for `ttl`
+    seconds, so any number of dashboard sessions cost one request per TTL;
+    callers that miss the cache together share one in-flight request
+    (INFLIGHT, via dhan_post). Missing / failed quotes are 0.0.
+    """
+    ids = tuple(sorted(str(s) for s in security_ids))
+    key = (segment, ids)
+    with _ltp_lock:
+        hit = _ltp_cache.get(key)
+    if hit and time.monotonic() - hit[0] < ttl:
+        return dict(hit[1])
+    try:
+        data = dhan_post("/marketfeed/ltp", ltp_payload(segment, ids), QUOTE_LIMITER)
+        prices = ltps_from_reply(data, segment, ids)
+    except Exception as e:
+        log_error(f"LTP quote error ({segment}): {e}", "ltp")
+        prices = dict.fromkeys(ids, 0.0)
+    with _ltp_lock:
+        _ltp_cache[key] = (time.monotonic(), prices)
+    return dict(prices)
+
+
+def ltp_payload(segment, ids):
+    return {segment: [int(s) for s in ids]}
+
+
+def ltps_from_reply(data, segment, ids):
+    quotes = (data.get("data") or {}).get(segment) or {}
+    return {sid: float((quotes.get(sid) or {}).get("last_price") or 0.0) for sid in ids}
+
+
+def cached_ltps(segment, security_ids, ttl=QUOTE_TTL_SECONDS):
+    """get_ltps() result if it is cached and fresh, else None (no request)."""
+    key = (segment, tuple(sorted(str(s) for s in security_ids)))
+    with _ltp_lock:
+        hit = _ltp_cache.get(key)
+    if hit and time.monotonic() - hit[0] < ttl:
+        return dict(hit[1])
+    return None
+
+
+def cache_ltps(segment, prices):
+    """Share quotes fetched elsewhere (e.g. the async client) with get_ltps()."""
+    key = (segment, tuple(sorted(prices)))
+    with _ltp_lock:
+        _ltp_cache[key] = (time.monotonic(), dict(prices))
+
+
+def get_index_ltps(security_ids, ttl=QUOTE_TTL_SECONDS):
+    return get_ltps("IDX_I", security_ids, ttl)
+
+
+def intraday_payload(security_id, instrument, from_d, to_d, interval_min):
+    return {
+        "securityId": str(security_id),
+        "exchangeSegment": "NSE_FNO",
+        "instrument": instrument,  # FUTSTK or FUTIDX
+        "expiryCode": 0,
+        "oi": True,
+        "fromDate": from_d,
+        "toDate": to_d,
+        "interval": int(interval_min),
+    }
+
+
+def _post_intraday_v2(security_id, instrument, from_d, to_d, interval_min=60):
+    """
+    Raw v2 intraday call. Raises on HTTP / network errors and never touches
+    Streamlit, so it is safe to call from scan worker threads.
+    """
+    payload = intraday_payload(security_id, instrument, from_d, to_d, interval_min)
+    data = dhan_post("/charts/intraday", payload)
+
+    with stage("decode"):
+        return decode_intraday(data)
+
+
+def _column(values, n, dtype):
+    """Typed length-n array; short columns are padded with their last value (0 if empty)."""
+    arr = np.asarray(values, dtype=np.float64)[:n]
+    if len(arr) < n:
+        arr = np.concatenate([arr, np.full(n - len(arr), arr[-1] if len(arr) else 0.0)])
+    return arr.astype(dtype, copy=False)
+
+
+def epoch_to_ist(ts):
+    """Vectorised epoch seconds -> tz-aware IST DatetimeIndex."""
+    return pd.to_datetime(ts, unit="s", utc=True).tz_convert(IST)
+
+
+def decode_intraday(data):
+    """
+    Dhan v2 chart response (parallel JSON arrays) -> bar DataFrame, built
+    straight from typed NumPy columns: int64 epoch, float64 OHLC, int64
+    volume / OI. No per-element Python work.
+    """
+    n = len(data.get("close") or ())
+    if not n:
+        return pd.DataFrame()
+
+    ts = _column(data.get("timestamp", ()), n, np.int64)
+    return pd.DataFrame(
+        {
+            "ts": ts,
+            "datetime": epoch_to_ist(ts),
+            "Open": _column(data.get("open", ()), n, np.float64),
+            "High": _column(data.get("high", ()), n, np.float64),
+            "Low": _column(data.get("low", ()), n, np.float64),
+            "Close": _column(data["close"], n, np.float64),
+            "Volume": _column(data.get("volume", ()), n, np.int64),
+            "OI": _column(data.get("open_interest", ()), n, np.int64),
+        }
+    )
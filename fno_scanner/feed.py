@@ -0,0 +1,331 @@
+"""
+Optional streaming mode: Dhan v2 market feed (WebSocket) -> in-memory
+BASE_INTERVAL_MIN candles + OI per security; coarser bars are resampled
+from them on request.
+
+LiveFeed.bars() has the same signature as stores.fetch_bars_incremental, so
+run_scan(fetch=feed.bars) scans straight from memory: the first request for
+a security seeds its history over REST and subscribes it to the feed; every
+later sweep only folds in the ticks that arrived since.
+"""
+import asyncio
+import json
+import struct
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import websockets
+
+from . import dhan
+from .config import BASE_INTERVAL_MIN
+from .dhan import epoch_to_ist, log_error
+from .stores import BAR_COLS, bucket_start, fetch_bars_incremental, resample_bars
+
+DHAN_FEED_URL = "wss://api-feed.dhan.co?version=2&token={token}&clientId={client_id}&authType=2"
+
+FEED_SUBSCRIBE_BATCH = 100  # instruments per subscribe message (Dhan limit)
+FEED_RECONNECT_SECONDS = 2.0
+FEED_KEEP_CANDLES = 400  # live candles kept per security
+
+# Request / response codes of the v2 feed protocol.
+REQ_SUBSCRIBE_QUOTE = 17
+REQ_DISCONNECT = 12
+RESP_TICKER = 2
+RESP_QUOTE = 4
+RESP_OI = 5
+RESP_PREV_CLOSE = 6
+RESP_DISCONNECT = 50
+
+SEGMENT_CODES = {"IDX_I": 0, "NSE_EQ": 1, "NSE_FNO": 2, "BSE_EQ": 4, "BSE_FNO": 8}
+
+# Little-endian binary packets: 8-byte header (code, length, segment, security id).
+HEADER = struct.Struct("<BHBI")
+TICKER = struct.Struct("<BHBIfi")
+QUOTE = struct.Struct("<BHBIfhifiiiffff")
+OI = struct.Struct("<BHBIi")
+PREV_CLOSE = struct.Struct("<BHBIfi")
+
+
+def feed_url(setting, client_id=None, access_token=None):
+    """
+    WebSocket URL for a LIVE_FEED setting: "dhan" means the real Dhan feed,
+    anything else is used as-is (e.g. ws://127.0.0.1:8765 for the mock).
+    """
+    if setting and setting.lower() != "dhan":
+        return setting
+    return DHAN_FEED_URL.format(
+        token=access_token or dhan.ACCESS_TOKEN, client_id=client_id or dhan.CLIENT_ID
+    )
+
+
+def parse_packets(buf):
+    """
+    Decode one binary feed message (possibly several packets) into
+    (code, security_id, fields) tuples. Unknown packet types are skipped.
+    """
+    out = []
+    pos = 0
+    while pos + HEADER.size <= len(buf):
+        code, length, _seg, sid = HEADER.unpack_from(buf, pos)
+        if length < HEADER.size:
+            break
+        sid = str(sid)
+        if code == RESP_QUOTE and pos + QUOTE.size <= len(buf):
+            f = QUOTE.unpack_from(buf, pos)
+            out.append((code, sid, {"ltp": round(f[4], 2), "ltt": f[6], "volume": f[8]}))
+        elif code == RESP_TICKER and pos + TICKER.size <= len(buf):
+            f = TICKER.unpack_from(buf, pos)
+            out.append((code, sid, {"ltp": round(f[4], 2), "ltt": f[5]}))
+        elif code == RESP_OI and pos + OI.size <= len(buf):
+            out.append((code, sid, {"oi": OI.unpack_from(buf, pos)[4]}))
+        elif code == RESP_PREV_CLOSE and pos + PREV_CLOSE.size <= len(buf):
+            f = PREV_CLOSE.unpack_from(buf, pos)
+            out.append((code, sid, {"prev_close": f[4], "prev_oi": f[5]}))
+        elif code == RESP_DISCONNECT:
+            out.append((code, sid, {}))
+        pos += length
+    return out
+
+
+def subscribe_messages(instruments, request_code=REQ_SUBSCRIBE_QUOTE):
+    """JSON subscribe messages for [(segment, security_id)], FEED_SUBSCRIBE_BATCH per message."""
+    instruments = list(instruments)
+    msgs = []
+    for i in range(0, len(instruments), FEED_SUBSCRIBE_BATCH):
+        chunk = instruments[i:i + FEED_SUBSCRIBE_BATCH]
+        msgs.append(
+            json.dumps(
+                {
+                    "RequestCode": request_code,
+                    "InstrumentCount": len(chunk),
+                    "InstrumentList": [
+                        {"ExchangeSegment": seg, "SecurityId": str(sid)} for seg, sid in chunk
+                    ],
+                }
+            )
+        )
+    return msgs
+
+
+class CandleBook:
+    """
+    Thread-safe tick -> candle aggregation at one interval (the scanner's
+    BASE_INTERVAL_MIN). Per security it holds the REST history it was seeded
+    with plus live candles [ts, O, H, L, C, V, OI]. Quote volume is
+    cumulative for the day, so each tick adds the delta.
+    """
+
+    def __init__(self, interval_min=BASE_INTERVAL_MIN, keep=FEED_KEEP_CANDLES):
+        self.interval_min = interval_min
+        self.keep = keep
+        self.lock = threading.Lock()
+        self.history = {}
+        self.candles = {}
+        self.cum_volume = {}
+        self.oi = {}
+        self.ticks = 0
+
+    def seed(self, security_id, df):
+        """Start from REST bars; the last (forming) bar keeps updating from ticks."""
+        key = str(security_id)
+        with self.lock:
+            if df is None or df.empty:
+                self.history[key] = pd.DataFrame(columns=BAR_COLS)
+                self.candles[key] = []
+                return
+            last = df.iloc[-1]
+            self.history[key] = df.iloc[:-1][BAR_COLS].reset_index(drop=True)
+            self.candles[key] = [
+                [
+                    int(last["ts"]),
+                    float(last["Open"]),
+                    float(last["High"]),
+                    float(last["Low"]),
+                    float(last["Close"]),
+                    int(last["Volume"]),
+                    int(last["OI"]),
+                ]
+            ]
+
+    def seeded(self, security_id):
+        return str(security_id) in self.history
+
+    def reset(self):
+        """Forget everything (after a reconnect the gap must be re-seeded)."""
+        with self.lock:
+            self.history.clear()
+            self.candles.clear()
+            self.cum_volume.clear()
+
+    def on_quote(self, security_id, ts, ltp, cum_volume=None):
+        if ltp <= 0:
+            return
+        with self.lock:
+            delta = 0
+            if cum_volume is not None:
+                last = self.cum_volume.get(security_id)
+                if last is not None:
+                    delta = cum_volume - last if cum_volume >= last else cum_volume
+                self.cum_volume[security_id] = cum_volume
+            oi = self.oi.get(security_id)
+            start = bucket_start(int(ts), self.interval_min)
+            candles = self.candles.setdefault(security_id, [])
+            if candles and candles[-1][0] == start:
+                c = candles[-1]
+                c[2] = max(c[2], ltp)
+                c[3] = min(c[3], ltp)
+                c[4] = ltp
+                c[5] += delta
+                if oi is not None:
+                    c[6] = oi
+            elif not candles or start > candles[-1][0]:
+                prev_oi = candles[-1][6] if candles else 0
+                candles.append([start, ltp, ltp, ltp, ltp, delta, prev_oi if oi is None else oi])
+                if len(candles) > self.keep:
+                    del candles[: len(candles) - self.keep]
+            self.ticks += 1
+
+    def on_oi(self, security_id, oi):
+        with self.lock:
+            self.oi[security_id] = oi
+            candles = self.candles.get(security_id)
+            if candles:
+                candles[-1][6] = oi
+
+    def frame(self, security_id):
+        """Bars in the BarStore layout: seeded history + live candles."""
+        key = str(security_id)
+        with self.lock:
+            hist = self.history.get(key)
+            live = [list(c) for c in self.candles.get(key, ())]
+        if not live:
+            return hist.copy() if hist is not None else pd.DataFrame(columns=BAR_COLS)
+
+        arr = np.array(live, dtype=np.float64)
+        ts = arr[:, 0].astype(np.int64)
+        live_df = pd.DataFrame(
+            {
+                "ts": ts,
+                "datetime": epoch_to_ist(ts),
+                "Open": arr[:, 1],
+                "High": arr[:, 2],
+                "Low": arr[:, 3],
+                "Close": arr[:, 4],
+                "Volume": arr[:, 5].astype(np.int64),
+                "OI": arr[:, 6].astype(np.int64),
+            }
+        )
+        if hist is None or hist.empty:
+            return live_df
+        return pd.concat([hist[hist["ts"] < ts[0]], live_df], ignore_index=True)
+
+
+class LiveFeed:
+    """
+    Background WebSocket client (own thread + asyncio loop). Subscribes every
+    security the scanner asks for, feeds ticks into a CandleBook and
+    reconnects with a fixed back-off. While disconnected, bars() falls back
+    to REST polling.
+    """
+
+    def __init__(self, url=None, segment="NSE_FNO", book=None):
+        self.url = url or feed_url("dhan")
+        self.segment = segment
+        self.book = book or CandleBook()
+        self.lock = threading.Lock()
+        self.wanted = set()
+        self.sent = set()
+        self.connected = False
+        self.last_tick = 0.0
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self._thread_main, name="live-feed", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+
+    def subscribe(self, security_ids):
+        with self.lock:
+            self.wanted.update(str(s) for s in security_ids)
+
+    def bars(self, security_id, instrument, from_d, to_d, interval_min=60):
+        """
+        Drop-in for fetch_bars_incremental: memory when streaming, else REST.
+        Multiples of the book's interval are resampled from its candles;
+        anything finer always comes from REST.
+        """
+        sid = str(security_id)
+        base = self.book.interval_min
+        if interval_min % base:
+            return fetch_bars_incremental(sid, instrument, from_d, to_d, interval_min)
+        if self.connected and self.book.seeded(sid):
+            return resample_bars(self.book.frame(sid), interval_min, base)
+        df = fetch_bars_incremental(sid, instrument, from_d, to_d, base)
+        if self.connected:
+            self.book.seed(sid, df)
+            self.subscribe([sid])
+        return resample_bars(df, interval_min, base)
+
+    def status(self):
+        return {
+            "connected": self.connected,
+            "subscribed": len(self.sent),
+            "ticks": self.book.ticks,
+            "last_tick_age_s": round(time.time() - self.last_tick, 1) if self.last_tick else None,
+        }
+
+    def _thread_main(self):
+        asyncio.run(self._run())
+
+    async def _run(self):
+        while not self.stopping.is_set():
+            try:
+                async with websockets.connect(self.url, max_size=None) as ws:
+                    self.connected = True
+                    while not self.stopping.is_set():
+                        await self._flush_subscriptions(ws)
+                        try:
+                            msg = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                        except asyncio.TimeoutError:
+                            continue
+                        if isinstance(msg, bytes):
+                            self._handle(msg)
+                    await ws.send(json.dumps({"RequestCode": REQ_DISCONNECT}))
+            except Exception as e:
+                log_error(f"Live feed error: {e}", "feed")
+            finally:
+                # Ticks missed while down: every security re-seeds over REST.
+                self.connected = False
+                self.book.reset()
+                with self.lock:
+                    self.sent.clear()
+            if not self.stopping.is_set():
+                await asyncio.sleep(FEED_RECONNECT_SECONDS)
+
+    async def _flush_subscriptions(self, ws):
+        with self.lock:
+            pending = sorted(self.wanted - self.sent)
+            self.sent.update(pending)
+        for msg in subscribe_messages((self.segment, sid) for sid in pending):
+            await ws.send(msg)
+
+    def _handle(self, msg):
+        # Candles are bucketed by arrival time: LTT is whole seconds and
+        # repeats on quote-only updates.
+        now = time.time()
+        for code, sid, f in parse_packets(msg):
+            if code in (RESP_QUOTE, RESP_TICKER):
+                self.book.on_quote(sid, now, f["ltp"], f.get("volume"))
+                self.last_tick = now
+            elif code == RESP_OI:
+                self.book.on_oi(sid, f["oi"])
+            elif code == RESP_DISCONNECT:
+                raise ConnectionError("feed sent disconnect")
@@ -0,0 +1,185 @@
+"""
+Scan history: every published snapshot appended to a Parquet store
+partitioned by trading day and table,
+
+    scan_history/date=2026-10-16/table=bull/part-101503-1a2b3c4d.parquet
+
+written in batches from a background thread so the scan loop never waits on
+disk, with old days pruned so the store stays bounded.
+"""
+import atexit
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from .config import (
+    HISTORY_DIR,
+    HISTORY_FLUSH_SCANS,
+    HISTORY_FLUSH_SECONDS,
+    HISTORY_KEEP_DAYS,
+    IST,
+)
+from .dhan import log_error
+
+HISTORY_TABLES = (("index", "index_rows"), ("bull", "bull"), ("bear", "bear"), ("all", "all_data"))
+HISTORY_DROP_COLS = ["Symbol"]  # TradingView URL: derivable from Sym
+
+
+def snapshot_frames(snapshot):
+    """{table: DataFrame} for one snapshot, each row stamped with scan_time."""
+    frames = {}
+    for table, key in HISTORY_TABLES:
+        rows = snapshot.get(key)
+        if rows is None or not len(rows):
+            continue
+        df = pd.DataFrame(rows).drop(columns=HISTORY_DROP_COLS, errors="ignore")
+        df.insert(0, "scan_time", pd.Timestamp(snapshot["time"]))
+        frames[table] = df
+    return frames
+
+
+class ScanHistoryWriter:
+    """
+    append() only enqueues (dropping the oldest scan if the queue is full);
+    a daemon thread collects scans and writes one Parquet part per
+    (day, table) every `flush_scans` scans or `flush_seconds`, whichever
+    comes first. Anything still pending is flushed at interpreter exit.
+    """
+
+    QUEUE_MAX = 200
+
+    def __init__(
+        self,
+        root=HISTORY_DIR,
+        flush_scans=HISTORY_FLUSH_SCANS,
+        flush_seconds=HISTORY_FLUSH_SECONDS,
+        keep_days=HISTORY_KEEP_DAYS,
+    ):
+        self.root = root
+        self.flush_scans = flush_scans
+        self.flush_seconds = flush_seconds
+        self.keep_days = keep_days
+        self.queue = queue.Queue(self.QUEUE_MAX)
+        self.pending = []
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.thread = None
+        self.written = 0
+        atexit.register(self.flush)
+
+    def append(self, snapshot):
+        if snapshot is None:
+            return
+        self._ensure_thread()
+        while True:
+            try:
+                self.queue.put_nowait(snapshot)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    log_error("Scan history queue full, dropped the oldest scan", "history")
+                except queue.Empty:
+                    pass
+
+    def _ensure_thread(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self._loop, name="scan-history", daemon=True
+                )
+                self.thread.start()
+
+    def _loop(self):
+        self.prune()
+        started = time.monotonic()
+        while True:
+            timeout = max(0.1, self.flush_seconds - (time.monotonic() - started))
+            try:
+                snapshot = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                snapshot = None
+            with self.lock:
+                if snapshot is not None:
+                    self.pending.append(snapshot)
+                pending = len(self.pending)
+            if not pending:
+                started = time.monotonic()
+            elif pending >= self.flush_scans or time.monotonic() - started >= self.flush_seconds:
+                self.flush()
+                started = time.monotonic()
+
+    def flush(self):
+        """Write everything pending or queued now (also run at interpreter exit)."""
+        with self.write_lock:
+            with self.lock:
+                while True:
+                    try:
+                        self.pending.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                batch, self.pending = self.pending, []
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        groups = {}
+        for snapshot in batch:
+            day = snapshot["time"].strftime("%Y-%m-%d")
+            for table, df in snapshot_frames(snapshot).items():
+                groups.setdefault((day, table), []).append(df)
+        for (day, table), frames in groups.items():
+            part_dir = os.path.join(self.root, f"date={day}", f"table={table}")
+            try:
+                os.makedirs(part_dir, exist_ok=True)
+                first = frames[0]["scan_time"].iloc[0]
+                name = f"part-{first.strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+                pd.concat(frames, ignore_index=True).to_parquet(
+                    os.path.join(part_dir, name), index=False
+                )
+                self.written += len(frames)
+            except Exception as e:
+                log_error(f"Scan history write failed ({day} {table}): {e}", "history")
+
+    def prune(self):
+        """Delete day partitions older than keep_days."""
+        if not os.path.isdir(self.root):
+            return
+        cutoff = (datetime.now(IST) - timedelta(days=self.keep_days)).strftime("%Y-%m-%d")
+        for name in os.listdir(self.root):
+            if name.startswith("date=") and name[5:] < cutoff:
+                shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+
+
+def load_history(day, table="all", columns=None, root=HISTORY_DIR):
+    """Every stored row of one table for one trading day ("YYYY-MM-DD"), by scan_time."""
+    path = os.path.join(root, f"date={day}", f"table={table}")
+    if not os.path.isdir(path):
+        return pd.DataFrame()
+    df = pd.read_parquet(path, columns=columns)
+    return df.sort_values("scan_time", kind="stable").reset_index(drop=True)
+
+
+def conviction_evolution(day, symbols=None, root=HISTORY_DIR):
+    """
+    Conviction per scan for the day's flagged symbols: long frame with
+    scan_time, Sym, side, Conviction (optionally only `symbols`).
+    """
+    cols = ["scan_time", "Sym", "Conviction"]
+    frames = []
+    for side in ("bull", "bear"):
+        df = load_history(day, side, cols, root)
+        if not df.empty:
+            frames.append(df.assign(side=side))
+    if not frames:
+        return pd.DataFrame(columns=cols + ["side"])
+    out = pd.concat(frames, ignore_index=True)
+    if symbols is not None:
+        out = out[out["Sym"].isin(list(symbols))]
+    return out.sort_values(["scan_time", "Sym"], kind="stable").reset_index(drop=True)
@@ -0,0 +1,161 @@
+"""
+Incremental RSI / ADX / EMA matching pandas_ta `rsi(14)`, `adx(14)` and `ema(5)`.
+"""
+
+
+RSI_LEN = 14
+ADX_LEN = 14
+EMA_LEN = 5
+NAN = float("nan")
+
+
+def _ewm_step(state, x, alpha, min_periods):
+    """
+    One step of pandas `ewm(alpha=alpha, adjust=True, min_periods=...).mean()`
+    (what pandas_ta's `rma` uses). state = (mean, old_weight, nobs).
+    """
+    mean, old_wt, nobs = state
+    is_obs = x == x
+    nobs += is_obs
+    if mean == mean:
+        old_wt *= 1.0 - alpha
+        if is_obs:
+            mean = (old_wt * mean + x) / (old_wt + 1.0)
+            old_wt += 1.0
+    elif is_obs:
+        mean = x
+    return (mean, old_wt, nobs), (mean if nobs >= min_periods else NAN)
+
+
+EWM_EMPTY = (NAN, 1.0, 0)
+
+
+class IndicatorState:
+    """
+    Wilder / EMA smoothing state for one security, updated in O(1) per bar.
+    `committed` is the state after every closed bar; the last (still forming)
+    bar is re-applied on top of it each scan, so updates to it are cheap too.
+    Outputs match pandas_ta `rsi(14)`, `adx(14)["ADX_14"]` and `ema(5)`.
+    """
+
+    __slots__ = ("first_ts", "committed_ts", "committed", "last")
+
+    def __init__(self):
+        self.first_ts = None
+        self.committed_ts = None
+        self.committed = {
+            "prev": None,  # (high, low, close) of the previous bar
+            "gain": EWM_EMPTY,
+            "loss": EWM_EMPTY,
+            "tr": EWM_EMPTY,
+            "pos": EWM_EMPTY,
+            "neg": EWM_EMPTY,
+            "dx": EWM_EMPTY,
+            "ema_seed": (),
+            "ema": NAN,
+        }
+        self.last = (NAN, NAN, NAN)
+
+    @staticmethod
+    def step(s, high, low, close):
+        s = dict(s)
+        prev = s["prev"]
+        if prev is None:
+            diff = up = dn = tr = NAN
+        else:
+            p_high, p_low, p_close = prev
+            diff = close - p_close
+            up = high - p_high
+            dn = p_low - low
+            tr = max(high - low, abs(high - p_close), abs(p_close - low))
+
+        # RSI: rma of gains / losses
+        gain = diff if diff != diff else max(diff, 0.0)
+        loss = diff if diff != diff else min(diff, 0.0)
+        s["gain"], avg_gain = _ewm_step(s["gain"], gain, 1.0 / RSI_LEN, RSI_LEN)
+        s["loss"], avg_loss = _ewm_step(s["loss"], loss, 1.0 / RSI_LEN, RSI_LEN)
+        denom = avg_gain + abs(avg_loss)
+        rsi = 100.0 * avg_gain / denom if denom else NAN
+
+        # ADX: rma of TR, +DM, -DM, then rma of DX
+        if up != up:
+            pos = neg = NAN
+        else:
+            pos = up if (up > dn and up > 0) else 0.0
+            neg = dn if (dn > up and dn > 0) else 0.0
+        s["tr"], atr = _ewm_step(s["tr"], tr, 1.0 / ADX_LEN, ADX_LEN)
+        s["pos"], pos_avg = _ewm_step(s["pos"], pos, 1.0 / ADX_LEN, ADX_LEN)
+        s["neg"], neg_avg = _ewm_step(s["neg"], neg, 1.0 / ADX_LEN, ADX_LEN)
+        dx = NAN
+        if atr == atr and atr != 0:
+            dmp = 100.0 * pos_avg / atr
+            dmn = 100.0 * neg_avg / atr
+            if dmp + dmn != 0:
+                dx = 100.0 * abs(dmp - dmn) / (dmp + dmn)
+        s["dx"], adx = _ewm_step(s["dx"], dx, 1.0 / ADX_LEN, ADX_LEN)
+
+        # EMA seeded with the SMA of the first EMA_LEN closes (pandas_ta presma)
+        if len(s["ema_seed"]) < EMA_LEN:
+            s["ema_seed"] = s["ema_seed"] + (close,)
+            if len(s["ema_seed"]) == EMA_LEN:
+                s["ema"] = sum(s["ema_seed"]) / EMA_LEN
+        else:
+            alpha = 2.0 / (EMA_LEN + 1)
+            s["ema"] = alpha * close + (1.0 - alpha) * s["ema"]
+
+        s["prev"] = (high, low, close)
+        return s, (rsi, adx, s["ema"])
+
+
+class IndicatorEngine:
+    """Per-(security, interval) IndicatorState registry fed from BarStore frames."""
+
+    def __init__(self):
+        self.states = {}
+
+    def update(self, key, df):
+        """
+        Bring `key`'s state up to date with `df` (BarStore frame, ascending ts)
+        and return (rsi, adx, ema) for its last bar. Only bars after the last
+        committed one are processed; the state is rebuilt from scratch when the
+        scan window slides (new day) or the last committed bar is missing or
+        has different high / low / close in `df` (history rewritten). A
+        correction to an older bar alone goes unnoticed.
+        """
+        if df.empty:
+            return NAN, NAN, NAN
+
+        ts = df["ts"].to_numpy()
+        highs = df["High"].to_numpy(dtype=float)
+        lows = df["Low"].to_numpy(dtype=float)
+        closes = df["Close"].to_numpy(dtype=float)
+
+        ind = self.states.get(key)
+        start = 0
+        if ind is not None and ind.first_ts == ts[0] and ind.committed_ts is not None:
+            start = int(ts.searchsorted(ind.committed_ts, side="right"))
+            if (
+                start == 0
+                or ts[start - 1] != ind.committed_ts
+                or start >= len(ts)
+                or ind.committed["prev"] != (highs[start - 1], lows[start - 1], closes[start - 1])
+            ):
+                ind = None
+        else:
+            ind = None
+        if ind is None:
+            ind = IndicatorState()
+            ind.first_ts = ts[0]
+            start = 0
+
+        state = ind.committed
+        for i in range(start, len(ts) - 1):
+            state, _ = IndicatorState.step(state, highs[i], lows[i], closes[i])
+            ind.committed_ts = ts[i]
+        ind.committed = state
+        _, ind.last = IndicatorState.step(state, highs[-1], lows[-1], closes[-1])
+        self.states[key] = ind
+        return ind.last
+
+
+INDICATORS = IndicatorEngine()
@@ -0,0 +1,106 @@
+"""
+NSE session clock (pandas_market_calendars "XNSE"): tells the scan loop,
+the CLI and the dashboard whether polling can change anything right now.
+"""
+import threading
+from datetime import datetime, time as dtime, timedelta
+
+import pandas as pd
+import pandas_market_calendars as mcal
+
+from .config import IST, MARKET_CALENDAR, POST_CLOSE_GRACE_MINUTES, WARMUP_MINUTES
+from .dhan import log_error
+
+PHASE_OPEN = "open"
+PHASE_WARMUP = "warmup"  # just before 09:15: fill caches so the first sweep is cheap
+PHASE_CLOSED = "closed"
+
+
+class MarketClock:
+    """
+    Trading sessions from the exchange calendar (holidays included), cached
+    for a rolling window. If the calendar cannot answer, falls back to
+    Mon-Fri 09:15-15:30 IST.
+    """
+
+    WINDOW_DAYS = 30
+
+    def __init__(
+        self,
+        calendar=MARKET_CALENDAR,
+        warmup_minutes=WARMUP_MINUTES,
+        grace_minutes=POST_CLOSE_GRACE_MINUTES,
+    ):
+        self.calendar_name = calendar
+        self.warmup = timedelta(minutes=warmup_minutes)
+        self.grace = timedelta(minutes=grace_minutes)
+        self.lock = threading.Lock()
+        self.sessions = []  # [(open, close)] tz-aware IST, ascending
+        self.window = None  # (first_date, last_date) covered by `sessions`
+
+    def _fallback_sessions(self, start, end):
+        sessions = []
+        day = start
+        while day <= end:
+            if day.weekday() < 5:
+                sessions.append(
+                    (
+                        IST.localize(datetime.combine(day, dtime(9, 15))),
+                        IST.localize(datetime.combine(day, dtime(15, 30))),
+                    )
+                )
+            day += timedelta(days=1)
+        return sessions
+
+    def _load(self, today):
+        start = today - timedelta(days=7)
+        end = today + timedelta(days=self.WINDOW_DAYS)
+        try:
+            cal = mcal.get_calendar(self.calendar_name)
+            sched = cal.schedule(start_date=start, end_date=end)
+            sessions = [
+                (o.tz_convert(IST).to_pydatetime(), c.tz_convert(IST).to_pydatetime())
+                for o, c in zip(sched["market_open"], sched["market_close"])
+            ]
+        except Exception as e:
+            log_error(f"Market calendar error ({self.calendar_name}): {e}", "calendar")
+            sessions = self._fallback_sessions(start, end)
+        self.sessions = sessions
+        self.window = (today, end - timedelta(days=7))
+
+    def _sessions_for(self, now):
+        today = now.date()
+        with self.lock:
+            if self.window is None or not (self.window[0] <= today <= self.window[1]):
+                self._load(today)
+            return self.sessions
+
+    def phase(self, now=None):
+        now = now or datetime.now(IST)
+        for open_, close in self._sessions_for(now):
+            if open_ <= now <= close + self.grace:
+                return PHASE_OPEN
+            if open_ - self.warmup <= now < open_:
+                return PHASE_WARMUP
+        return PHASE_CLOSED
+
+    def is_active(self, now=None):
+        return self.phase(now) != PHASE_CLOSED
+
+    def next_open(self, now=None):
+        """Start of the next session that has not opened yet (IST)."""
+        now = now or datetime.now(IST)
+        for open_, _ in self._sessions_for(now):
+            if open_ > now:
+                return open_
+        return pd.Timestamp(now).normalize().to_pydatetime() + timedelta(days=1)
+
+    def seconds_until_active(self, now=None):
+        """0 while open / warming up, else seconds until the next warm-up starts."""
+        now = now or datetime.now(IST)
+        if self.is_active(now):
+            return 0.0
+        return max(0.0, (self.next_open(now) - self.warmup - now).total_seconds())
+
+
+MARKET = MarketClock()
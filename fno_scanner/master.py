@@ -0,0 +1,236 @@
+"""
+Instrument master (dhan_master.csv) loaders.
+
+The CSV is parsed once into a compiled index (pickled next to the CSV as
+<name>.idx.pkl) and recompiled only when the CSV's size or mtime changes, so
+app / CLI start-up is an unpickle instead of a pandas parse.
+"""
+import os
+import pickle
+import threading
+from bisect import bisect_left
+from datetime import datetime
+
+import pandas as pd
+
+from .config import IST, MASTER_CSV_PATH
+
+INDEX_FORMAT_VERSION = 1
+INDEX_EXCHANGE = "NSE"
+INDEX_INSTRUMENTS = ("FUTSTK", "FUTIDX")
+
+_MASTER_COLS = [
+    "SEM_EXM_EXCH_ID",
+    "SEM_SMST_SECURITY_ID",
+    "SEM_INSTRUMENT_NAME",
+    "SEM_TRADING_SYMBOL",
+    "SEM_CUSTOM_SYMBOL",
+    "SEM_EXPIRY_DATE",
+]
+
+
+class Instrument:
+    """One futures contract from the master file."""
+
+    __slots__ = ("security_id", "underlying", "instrument", "expiry", "symbol", "name")
+
+    def __init__(self, security_id, underlying, instrument, expiry, symbol, name):
+        self.security_id = security_id
+        self.underlying = underlying
+        self.instrument = instrument
+        self.expiry = expiry  # datetime.date
+        self.symbol = symbol
+        self.name = name
+
+    def __getstate__(self):
+        return tuple(getattr(self, s) for s in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    def __repr__(self):
+        return f"Instrument({self.symbol!r}, id={self.security_id!r}, expiry={self.expiry})"
+
+
+class InstrumentIndex:
+    """
+    {(underlying, instrument): contracts sorted by expiry}. nearest() is a dict
+    lookup plus a bisect over that underlying's (≤3) expiry ordinals.
+    """
+
+    def __init__(self, by_key, source=None):
+        self.by_key = by_key
+        self.source = source  # (size, mtime_ns) of the CSV it was compiled from
+        self._ordinals = {
+            key: [c.expiry.toordinal() for c in contracts]
+            for key, contracts in by_key.items()
+        }
+
+    def __getstate__(self):
+        return {"version": INDEX_FORMAT_VERSION, "source": self.source, "by_key": self.by_key}
+
+    def __setstate__(self, state):
+        if state.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError("stale instrument index format")
+        self.__init__(state["by_key"], state["source"])
+
+    def __len__(self):
+        return sum(len(c) for c in self.by_key.values())
+
+    def underlyings(self, instrument):
+        return sorted(u for (u, inst) in self.by_key if inst == instrument)
+
+    def contracts(self, underlying, instrument):
+        return self.by_key.get((underlying, instrument), [])
+
+    def nearest(self, underlying, instrument, on_or_after):
+        """Nearest contract expiring on or after the given date, or None."""
+        key = (underlying, instrument)
+        ordinals = self._ordinals.get(key)
+        if not ordinals:
+            return None
+        i = bisect_left(ordinals, on_or_after.toordinal())
+        return self.by_key[key][i] if i < len(ordinals) else None
+
+
+def _source_stamp(path):
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+
+def index_path_for(path):
+    return os.path.splitext(path)[0] + ".idx.pkl"
+
+
+def parse_master(path=MASTER_CSV_PATH):
+    """
+    InstrumentIndex of the NSE FUTSTK / FUTIDX contracts in dhan_master.csv.
+    Raises if the master file is missing or unreadable.
+    """
+    source = _source_stamp(path)
+    df = pd.read_csv(
+        path,
+        usecols=lambda c: c.strip() in _MASTER_COLS,
+        dtype=str,
+        encoding="utf-8-sig",
+        on_bad_lines="skip",
+    )
+    df.columns = df.columns.str.strip()
+    for col in _MASTER_COLS:
+        if col not in df.columns:
+            df[col] = ""
+        df[col] = df[col].fillna("").str.strip()
+
+    df = df[
+        (df["SEM_EXM_EXCH_ID"] == INDEX_EXCHANGE)
+        & df["SEM_INSTRUMENT_NAME"].isin(INDEX_INSTRUMENTS)
+    ]
+    expiry = pd.to_datetime(df["SEM_EXPIRY_DATE"], format="%d-%m-%Y %H:%M", errors="coerce")
+    df = df.assign(expiry=expiry.dt.date, SEM_TRADING_SYMBOL=df["SEM_TRADING_SYMBOL"].str.upper())
+    df = df[expiry.notna()]
+    df = df.assign(underlying=df["SEM_TRADING_SYMBOL"].str.split("-").str[0])
+    df = df.sort_values(["underlying", "SEM_INSTRUMENT_NAME", "expiry"])
+
+    by_key = {}
+    for sid, under, inst, exp, sym, custom in zip(
+        df["SEM_SMST_SECURITY_ID"],
+        df["underlying"],
+        df["SEM_INSTRUMENT_NAME"],
+        df["expiry"],
+        df["SEM_TRADING_SYMBOL"],
+        df["SEM_CUSTOM_SYMBOL"],
+    ):
+        by_key.setdefault((under, inst), []).append(
+            Instrument(sid, under, inst, exp, sym, custom or sym)
+        )
+
+    return InstrumentIndex(by_key, source)
+
+
+def compile_master(path=MASTER_CSV_PATH, out_path=None):
+    """Parse path and pickle the index to out_path (default: index_path_for(path))."""
+    index = parse_master(path)
+    out_path = out_path or index_path_for(path)
+    tmp = f"{out_path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, out_path)
+    return index
+
+
+def load_instrument_index(path=MASTER_CSV_PATH):
+    """
+    The compiled index for path, recompiling when the CSV has changed since
+    the pickle was written (or the pickle is missing / from an older format).
+    """
+    idx_path = index_path_for(path)
+    try:
+        with open(idx_path, "rb") as f:
+            index = pickle.load(f)
+        if index.source == _source_stamp(path):
+            return index
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, KeyError, TypeError, ValueError):
+        pass
+    try:
+        return compile_master(path, idx_path)
+    except PermissionError:
+        return parse_master(path)  # read-only deploy: parse every start
+
+
+def load_fno_stock_map(path=MASTER_CSV_PATH, index=None):
+    """
+    Current-month FUTSTK contract per underlying: {symbol: {"id", "name"}}.
+    Raises if the master file is missing or unreadable.
+    """
+    if index is None:
+        index = load_instrument_index(path)
+    today = datetime.now(IST).date()
+    fno_map = {}
+    for under in index.underlyings("FUTSTK"):
+        c = index.nearest(under, "FUTSTK", today)
+        if c is not None:
+            fno_map[under] = {"id": c.security_id, "name": c.name}
+    return fno_map
+
+
+def load_index_fut_ids(path=MASTER_CSV_PATH, index=None):
+    """
+    Auto-detect current (nearest non‑expired) index futures IDs (FUTIDX)
+    for NIFTY, BANKNIFTY, SENSEX from dhan_master.csv. [web:47][web:49]
+    """
+    ids = {"NIFTY": None, "BANKNIFTY": None, "SENSEX": None}
+
+    if index is None:
+        if not os.path.exists(path):
+            return ids
+        index = load_instrument_index(path)
+
+    today = datetime.now(IST).date()
+    for base in ids:
+        c = index.nearest(base, "FUTIDX", today)
+        ids[base] = c.security_id if c is not None else None
+    return ids
+
+
+_universe_lock = threading.Lock()
+_universe_cache = {}
+
+
+def get_universe(path=MASTER_CSV_PATH):
+    """
+    (FNO_MAP, INDEX_FUT_MAP), re-read at most once per trading day or when
+    the master file changes. Missing file -> ({}, all-None index ids).
+    """
+    if not os.path.exists(path):
+        return {}, load_index_fut_ids(path)
+    key = (path, os.path.getmtime(path), datetime.now(IST).date())
+    with _universe_lock:
+        if key not in _universe_cache:
+            _universe_cache.clear()
+            index = load_instrument_index(path)
+            _universe_cache[key] = (
+                load_fno_stock_map(path, index),
+                load_index_fut_ids(path, index),
+            )
+        return _universe_cache[key]
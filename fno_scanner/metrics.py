@@ -0,0 +1,200 @@
+"""
+Process-wide scan instrumentation: per-stage and HTTP latency histograms,
+HTTP status / rate-limit / error counters and the row counts of the last
+scan. Shown in the app's debug panel and served in Prometheus text format:
+
+    python -m fno_scanner scan --metrics-port 9108
+    curl http://127.0.0.1:9108/metrics
+"""
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PROM_PREFIX = "tradefinder"
+
+
+class LatencyHistogram:
+    """Thread-safe latency histogram per label (bucket bounds in ms)."""
+
+    BOUNDS_MS = (
+        5, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000, float("inf")
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def observe(self, label, seconds):
+        ms = seconds * 1000.0
+        with self.lock:
+            h = self.data.setdefault(
+                label, {"buckets": [0] * len(self.BOUNDS_MS), "count": 0, "sum_ms": 0.0}
+            )
+            for i, bound in enumerate(self.BOUNDS_MS):
+                if ms <= bound:
+                    h["buckets"][i] += 1
+                    break
+            h["count"] += 1
+            h["sum_ms"] += ms
+
+    def _quantile(self, h, q):
+        target, seen = q * h["count"], 0
+        for bound, n in zip(self.BOUNDS_MS, h["buckets"]):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def summary(self):
+        """{label: {"count", "mean_ms", "p50_ms", "p99_ms"}} (bucket upper bounds)."""
+        with self.lock:
+            return {
+                label: {
+                    "count": h["count"],
+                    "mean_ms": round(h["sum_ms"] / h["count"], 1),
+                    "p50_ms": self._quantile(h, 0.5),
+                    "p99_ms": self._quantile(h, 0.99),
+                }
+                for label, h in self.data.items()
+            }
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                label: (list(h["buckets"]), h["count"], h["sum_ms"])
+                for label, h in self.data.items()
+            }
+
+
+class Counters:
+    """Thread-safe counters (or gauges, via set()) keyed by a tuple of label values."""
+
+    def __init__(self, labels):
+        self.labels = labels
+        self.lock = threading.Lock()
+        self.data = {}
+
+    def inc(self, *values, n=1):
+        with self.lock:
+            self.data[values] = self.data.get(values, 0) + n
+
+    def set(self, *values, n):
+        with self.lock:
+            self.data[values] = n
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.data)
+
+
+# Stages: scan, prefetch, fetch, rate_limit_wait, json_decode, decode, indicators, scoring, render
+STAGE_LATENCY = LatencyHistogram()
+HTTP_LATENCY = LatencyHistogram()  # per Dhan endpoint
+HTTP_STATUS = Counters(("endpoint", "status"))  # "error" = connection error / timeout
+HTTP_RATE_LIMITED = Counters(("endpoint",))  # 429 replies
+HTTP_COALESCED = Counters(("endpoint",))  # requests answered by another caller's reply
+ERRORS = Counters(("kind",))  # every log_error, by source
+SCAN_ROWS = Counters(("table",))  # rows produced by the last scan
+SCANS = Counters(("result",))
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block into STAGE_LATENCY[name] (also when it raises)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_LATENCY.observe(name, time.perf_counter() - started)
+
+
+def record_scan(snapshot, seconds):
+    """Scan duration and the rows it produced per table."""
+    STAGE_LATENCY.observe("scan", seconds)
+    SCANS.inc("ok")
+    for table in ("index_rows", "all_data", "bull", "bear"):
+        rows = snapshot.get(table)
+        SCAN_ROWS.set(table, n=0 if rows is None else len(rows))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prom_labels(names, values):
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}" if pairs else ""
+
+
+def _prom_histogram(lines, name, help_, label, hist):
+    lines.append(f"# HELP {name} {help_}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, (buckets, count, sum_ms) in sorted(hist.snapshot().items()):
+        cumulative = 0
+        for bound, n in zip(LatencyHistogram.BOUNDS_MS, buckets):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound / 1000.0)
+            labels = _prom_labels((label, "le"), (key, le))
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _prom_labels((label,), (key,))
+        lines.append(f"{name}_sum{labels} {sum_ms / 1000.0}")
+        lines.append(f"{name}_count{labels} {count}")
+
+
+def _prom_counters(lines, name, help_, kind, counters):
+    lines.append(f"# HELP {name} {help_}")
+    lines.append(f"# TYPE {name} {kind}")
+    for values, n in sorted(counters.snapshot().items()):
+        lines.append(f"{name}{_prom_labels(counters.labels, values)} {n}")
+
+
+def render_prometheus():
+    """Every metric in the Prometheus text exposition format."""
+    p = PROM_PREFIX
+    lines = []
+    _prom_histogram(
+        lines, f"{p}_stage_seconds", "Scan pipeline stage durations.", "stage", STAGE_LATENCY
+    )
+    _prom_histogram(
+        lines, f"{p}_http_seconds", "Dhan HTTP request latency.", "endpoint", HTTP_LATENCY
+    )
+    for name, help_, kind, counters in (
+        ("http_responses_total", "Dhan HTTP responses by status.", "counter", HTTP_STATUS),
+        ("http_rate_limited_total", "Dhan HTTP 429 replies.", "counter", HTTP_RATE_LIMITED),
+        (
+            "http_coalesced_total",
+            "Dhan requests served by an identical in-flight or recent request.",
+            "counter",
+            HTTP_COALESCED,
+        ),
+        ("errors_total", "Logged errors by source.", "counter", ERRORS),
+        ("scans_total", "Completed scans.", "counter", SCANS),
+        ("scan_rows", "Rows produced by the last scan.", "gauge", SCAN_ROWS),
+    ):
+        _prom_counters(lines, f"{p}_{name}", help_, kind, counters)
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, host="0.0.0.0"):
+    """Serve /metrics from a daemon thread; returns the server (shutdown() to stop)."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,81 @@
+"""
+Local stand-in for the Dhan v2 market feed, for exercising streaming mode
+without market hours or credentials:
+
+    python -m fno_scanner mock-feed --port 8765
+    python -m fno_scanner scan --feed ws://127.0.0.1:8765 --interval 5
+
+Every subscribed security gets a random-walk quote packet (cumulative
+volume) each tick and an OI packet every few ticks.
+"""
+import asyncio
+import json
+import logging
+import random
+
+import websockets
+
+from .feed import OI, QUOTE, REQ_DISCONNECT, RESP_OI, RESP_QUOTE, SEGMENT_CODES
+
+logger = logging.getLogger("fno_scanner")
+
+
+class MockFeedServer:
+    def __init__(self, host="127.0.0.1", port=8765, tick_seconds=0.5, seed=None):
+        self.host = host
+        self.port = port
+        self.tick_seconds = tick_seconds
+        self.rng = random.Random(seed)
+        self.state = {}  # security_id -> [ltp, cum_volume, oi]
+
+    def _quote(self, seg, sid):
+        s = self.state.setdefault(
+            sid, [self.rng.uniform(100, 3000), 0, self.rng.randint(100_000, 5_000_000)]
+        )
+        s[0] = max(0.05, s[0] * (1 + self.rng.gauss(0, 0.0008)))
+        qty = self.rng.randint(1, 50) * 25
+        s[1] += qty
+        ltp = round(s[0], 2)
+        return QUOTE.pack(
+            RESP_QUOTE, QUOTE.size, seg, int(sid),
+            ltp, qty, 0, ltp, s[1], 0, 0, ltp, ltp, ltp, ltp,
+        )
+
+    def _oi(self, seg, sid):
+        s = self.state[sid]
+        s[2] = max(0, s[2] + self.rng.randint(-2000, 2000) * 25)
+        return OI.pack(RESP_OI, OI.size, seg, int(sid), s[2])
+
+    async def _handler(self, ws):
+        subs = set()
+
+        async def reader():
+            async for msg in ws:
+                req = json.loads(msg)
+                if req.get("RequestCode") == REQ_DISCONNECT:
+                    return
+                for inst in req.get("InstrumentList", ()):
+                    subs.add((SEGMENT_CODES.get(inst["ExchangeSegment"], 2), str(inst["SecurityId"])))
+
+        read_task = asyncio.ensure_future(reader())
+        n = 0
+        try:
+            while not read_task.done():
+                n += 1
+                for seg, sid in list(subs):
+                    await ws.send(self._quote(seg, sid))
+                    if n % 4 == 0:
+                        await ws.send(self._oi(seg, sid))
+                await asyncio.sleep(self.tick_seconds)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            read_task.cancel()
+
+    async def serve_forever(self):
+        async with websockets.serve(self._handler, self.host, self.port):
+            logger.info("mock feed on ws://%s:%d", self.host, self.port)
+            await asyncio.Future()
+
+    def run(self):
+        asyncio.run(self.serve_forever())
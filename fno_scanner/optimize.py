@@ -0,0 +1,190 @@
+"""
+Threshold search for the conviction model over cached bar panels:
+
+    python -m fno_scanner optimize --search random --samples 300 --horizon 3
+
+Indicators and per-bar metrics are computed once in the parent and placed
+in shared memory; a process pool scores every candidate CONVICTION_PARAMS
+set against them and the sets are ranked by hit rate, then expectancy
+(mean signed forward return) of their high-conviction signals.
+"""
+import itertools
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .backtest import BarPanel, forward_returns, panel_metrics, score_panel
+from .config import OPTIMIZE_HORIZON, OPTIMIZE_MIN_CONVICTION, OPTIMIZE_MIN_SIGNALS
+from .scoring import CONVICTION_PARAMS
+
+# Candidate values per CONVICTION_PARAMS key (the current value is always one of them).
+PARAM_GRID = {
+    "oi_chg": (1.5, 2.0, 3.0),
+    "oi_price": (0.3, 0.5, 0.8),
+    "adx": ((15, 20, 25), (20, 25, 30), (25, 30, 35)),
+    "bull_rsi": ((45, 50, 65, 70), (50, 55, 65, 70), (45, 50, 60, 65)),
+    "bear_rsi": ((30, 35, 50, 60), (30, 35, 45, 50), (35, 40, 50, 55)),
+    "vol_ratio": ((1.1, 1.3, 1.8), (1.2, 1.5, 2.0), (1.3, 1.8, 2.5)),
+    "oi_tiers": ((1, 3, 5), (2, 5, 8), (3, 6, 10)),
+}
+
+
+def grid_param_sets(grid=PARAM_GRID):
+    """Every combination of the grid's values."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+
+def random_param_sets(n, grid=PARAM_GRID, seed=None):
+    """`n` distinct random combinations (the default CONVICTION_PARAMS first)."""
+    rng = random.Random(seed)
+    total = 1
+    for values in grid.values():
+        total *= len(values)
+    seen = {tuple(CONVICTION_PARAMS[k] for k in grid)}
+    sets = [{k: CONVICTION_PARAMS[k] for k in grid}]
+    while len(sets) < min(n, total):
+        combo = tuple(rng.choice(values) for values in grid.values())
+        if combo not in seen:
+            seen.add(combo)
+            sets.append(dict(zip(grid, combo)))
+    return sets
+
+
+def _attach_block(name, child=False):
+    """
+    Open an existing shared-memory block without leaving it with a resource
+    tracker that would unlink it when this process exits: only the owner
+    unlinks. `child`: this process was started by the owner (a pool
+    worker), so it shares the owner's tracker, where the block is already
+    registered and unregistering it would break the owner's unlink().
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if not child:
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SharedArrays:
+    """
+    NumPy arrays copied into named shared-memory blocks. The owner creates
+    and finally unlinks them; workers attach() by `spec` without copying.
+    """
+
+    def __init__(self, arrays):
+        self.blocks = []
+        self.spec = {}
+        for name, arr in arrays.items():
+            arr = np.ascontiguousarray(arr)
+            shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+            np.ndarray(arr.shape, arr.dtype, buffer=shm.buf)[...] = arr
+            self.blocks.append(shm)
+            self.spec[name] = (shm.name, arr.shape, arr.dtype.str)
+
+    @staticmethod
+    def attach(spec, child=False):
+        """
+        (blocks, {name: array view}); keep `blocks` alive while the views are
+        used. Pass child=True from processes the owner started (pool workers).
+        """
+        blocks, arrays = [], {}
+        for name, (shm_name, shape, dtype) in spec.items():
+            shm = _attach_block(shm_name, child)
+            blocks.append(shm)
+            arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf)
+        return blocks, arrays
+
+    def close(self):
+        for shm in self.blocks:
+            shm.close()
+            shm.unlink()
+        self.blocks = []
+
+
+_WORKER = {}
+
+
+def _init_worker(spec, interval, horizon, min_conviction):
+    blocks, arrays = SharedArrays.attach(spec, child=True)
+    panel = BarPanel(
+        range(len(arrays["lengths"])), arrays["ts"], arrays["data"], arrays["lengths"], interval
+    )
+    metrics = {k[2:]: v for k, v in arrays.items() if k.startswith("m_")}
+    _WORKER.update(
+        blocks=blocks,
+        panel=panel,
+        metrics=metrics,
+        returns=forward_returns(panel, (horizon,))[horizon],
+        min_conviction=min_conviction,
+    )
+
+
+def evaluate(params, panel, metrics, returns, min_conviction=OPTIMIZE_MIN_CONVICTION):
+    """Signal count, hit rate and expectancy (%) of bars at or above min_conviction."""
+    scored = score_panel(panel, metrics, {**CONVICTION_PARAMS, **params})
+    picked = (scored["side"] != "") & (scored["conviction"] >= min_conviction)
+    sign = np.where(scored["side"][picked] == "bull", 1.0, -1.0)
+    r = returns[picked] * sign
+    r = r[~np.isnan(r)]
+    if not len(r):
+        return {"signals": 0, "hit_rate": np.nan, "expectancy": np.nan}
+    return {
+        "signals": len(r),
+        "hit_rate": round(float((r > 0).mean() * 100), 2),
+        "expectancy": round(float(r.mean()), 4),
+    }
+
+
+def _evaluate_in_worker(params):
+    w = _WORKER
+    return evaluate(params, w["panel"], w["metrics"], w["returns"], w["min_conviction"])
+
+
+def _label(value):
+    return "/".join(str(v) for v in value) if isinstance(value, tuple) else value
+
+
+def sweep(
+    panel,
+    param_sets,
+    horizon=OPTIMIZE_HORIZON,
+    min_conviction=OPTIMIZE_MIN_CONVICTION,
+    min_signals=OPTIMIZE_MIN_SIGNALS,
+    workers=None,
+):
+    """
+    Score every parameter set on `panel` in a process pool and return them
+    ranked (hit rate, then expectancy); sets with fewer than min_signals
+    signals are ranked last.
+    """
+    metrics = panel_metrics(panel)
+    arrays = {"ts": panel.ts, "data": panel.data, "lengths": panel.lengths}
+    arrays.update({f"m_{k}": v for k, v in metrics.items()})
+    shared = SharedArrays(arrays)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            initializer=_init_worker,
+            initargs=(shared.spec, panel.interval, horizon, min_conviction),
+        ) as pool:
+            results = list(pool.map(_evaluate_in_worker, param_sets, chunksize=4))
+    finally:
+        shared.close()
+
+    rows = [
+        {**{k: _label(v) for k, v in params.items()}, **res}
+        for params, res in zip(param_sets, results)
+    ]
+    df = pd.DataFrame(rows)
+    df["enough"] = df["signals"] >= min_signals
+    df = df.sort_values(
+        ["enough", "hit_rate", "expectancy"], ascending=False, kind="stable"
+    ).drop(columns="enough")
+    return df.reset_index(drop=True)
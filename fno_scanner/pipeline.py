@@ -0,0 +1,696 @@
+"""
+Scan pipeline: fetch -> indicators -> OI signal -> conviction for the whole
+F&O universe, plus the in-process ScanEngine and snapshot persistence.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+
+from .aiodhan import AsyncDhanClient, gather_with_timeout
+from .config import (
+    ASYNC_FETCH,
+    ASYNC_FETCH_TIMEOUT_SECONDS,
+    BASE_INTERVAL_MIN,
+    CONFIRM_INTERVALS,
+    INDEX_MAP,
+    IST,
+    MIN_SCAN_GAP_SECONDS,
+    QUOTE_TTL_SECONDS,
+    SCAN_INTERVAL_MIN,
+    SCAN_WORKERS,
+)
+from .dhan import cache_ltps, cached_ltps, get_index_ltps, log_error
+from .indicators import ADX_LEN, EMA_LEN, INDICATORS, RSI_LEN, IndicatorEngine
+from .market import MARKET
+from .master import get_universe
+from .metrics import SCANS, record_scan, stage
+from .planner import PLANNER
+from .scoring import (
+    batch_conviction,
+    batch_oi_signal,
+    batch_signal_side,
+    batch_timeframe_confirm,
+    batch_trend_analysis,
+    check_batch_parity,
+    get_oi_signal,
+    get_trend_analysis,
+)
+from .stores import (
+    BAR_STORE,
+    PREV_CLOSE_STORE,
+    SIGNAL_HISTORY,
+    fetch_bars_incremental,
+    fetch_bars_incremental_async,
+    fetch_intraday_v2_futidx,
+    fetch_timeframes,
+    get_prev_close_async,
+    get_prev_close_futstk,
+    get_prev_close_index,
+    get_prev_close_index_async,
+    resample_bars,
+)
+from .table import ALL_COLUMNS, SCAN_TABLE, SIGNAL_COLUMNS
+
+SCAN_TIMEFRAMES = (SCAN_INTERVAL_MIN, *CONFIRM_INTERVALS)
+
+
+def scan_symbol(sid, scan_from, scan_to, today, fetch=fetch_bars_incremental):
+    """
+    Fetch + indicators + OI change for one FUTSTK. Runs inside the scan
+    worker pool, so it must not call st.* (errors propagate to the caller).
+    Returns None when Dhan has no candles for the contract.
+    """
+    with stage("fetch"):
+        frames = fetch_timeframes(sid, "FUTSTK", scan_from, scan_to, SCAN_TIMEFRAMES, fetch)
+    df = frames[SCAN_INTERVAL_MIN]
+    if df.empty:
+        return None
+
+    with stage("indicators"):
+        rsi_now, adx_now, ema_now = INDICATORS.update((sid, SCAN_INTERVAL_MIN), df)
+    if len(df) >= RSI_LEN:
+        curr_rsi = float(rsi_now)
+        curr_adx = float(adx_now)
+    else:
+        curr_rsi = 0.0
+        curr_adx = 0.0
+
+    if len(df) >= EMA_LEN:
+        mom = round(
+            ((df["Close"].iloc[-1] - ema_now) / ema_now) * 100,
+            2,
+        )
+    else:
+        mom = 0.0
+
+    curr_vol = float(df["Volume"].iloc[-1])
+    avg_vol = (
+        df["Volume"].rolling(10).mean().iloc[-1]
+        if len(df) > 10
+        else curr_vol
+    )
+    vol_ratio = (curr_vol / avg_vol) if avg_vol > 0 else 1.0
+
+    curr = df.iloc[-1]
+    ltp = float(curr["Close"])
+
+    if len(df) > 1:
+        prev = df.iloc[-2]
+        p_chg = round(
+            ((ltp - prev["Close"]) / prev["Close"]) * 100,
+            2,
+        )
+    else:
+        p_chg = 0.0
+
+    prev_close = get_prev_close_futstk(sid)
+    if prev_close > 0:
+        day_price_chg = round(((ltp - prev_close) / prev_close) * 100, 2)
+    else:
+        day_price_chg = 0.0
+
+    oi_available = not (df["OI"].max() == 0 and df["OI"].min() == 0)
+
+    oi_chg = 0.0
+    if oi_available:
+        day_df = df[df["datetime"].dt.date == today]
+        if len(day_df) >= 2:
+            day_first = day_df.iloc[0]
+            day_last = day_df.iloc[-1]
+            oi_start = float(day_first.get("OI", 0) or 0)
+            oi_end = float(day_last.get("OI", 0) or 0)
+            if oi_start > 0:
+                oi_chg = round(
+                    ((oi_end - oi_start) / oi_start) * 100, 2
+                )
+
+    # Confirmation timeframes: RSI + momentum only, off the same base fetch.
+    confirm = {}
+    for m in CONFIRM_INTERVALS:
+        df_m = frames[m]
+        with stage("indicators"):
+            rsi_m, _, ema_m = INDICATORS.update((sid, m), df_m)
+        confirm[f"rsi_{m}"] = float(rsi_m) if len(df_m) >= RSI_LEN else 0.0
+        confirm[f"mom_{m}"] = (
+            round(((df_m["Close"].iloc[-1] - ema_m) / ema_m) * 100, 2)
+            if len(df_m) >= EMA_LEN
+            else 0.0
+        )
+
+    # OI signal, analysis and conviction are scored for the whole universe
+    # at once (batch_* helpers) once the sweep completes.
+    return {
+        **confirm,
+        "ltp": ltp,
+        "mom": mom,
+        "p_chg": p_chg,
+        "day_price_chg": day_price_chg,
+        "rsi": curr_rsi,
+        "adx": curr_adx,
+        "vol_ratio": vol_ratio,
+        "oi_available": oi_available,
+        "oi_chg": oi_chg,
+    }
+
+
+def index_quotes(ttl=QUOTE_TTL_SECONDS):
+    """
+    ({spot_id: LTP}, {spot_id: previous close}) for INDEX_MAP. Normally one
+    shared, TTL-cached quote request; while the day's previous closes are
+    not cached yet they and the quote are fetched concurrently.
+    """
+    spot_ids = [info["id"] for info in INDEX_MAP.values()]
+    trade_date = datetime.now(IST).strftime("%Y-%m-%d")
+    if all(PREV_CLOSE_STORE.get("IDX_I", sid, trade_date) is not None for sid in spot_ids):
+        return get_index_ltps(spot_ids, ttl), {sid: get_prev_close_index(sid) for sid in spot_ids}
+    return asyncio.run(_index_quotes(spot_ids, ttl))
+
+
+async def _index_quotes(spot_ids, ttl):
+    ltps = cached_ltps("IDX_I", spot_ids, ttl)
+    async with AsyncDhanClient() as client:
+        aws = [get_prev_close_index_async(client, sid) for sid in spot_ids]
+        if ltps is None:
+            aws.append(client.ltps("IDX_I", spot_ids))
+        results = await asyncio.gather(*aws)
+    if ltps is None:
+        ltps = results.pop()
+        cache_ltps("IDX_I", ltps)
+    return ltps, dict(zip(spot_ids, results))
+
+
+class PrefetchedBars:
+    """
+    `fetch` stand-in serving the base bars prefetch_scan() fetched up front
+    (re-raising a security's fetch error); anything else goes to `fallback`.
+    """
+
+    def __init__(self, bars, fallback=fetch_bars_incremental):
+        self.bars = bars
+        self.fallback = fallback
+
+    def __call__(self, security_id, instrument, from_d, to_d, interval_min=60):
+        hit = self.bars.get(str(security_id)) if interval_min == BASE_INTERVAL_MIN else None
+        if hit is None:
+            return self.fallback(security_id, instrument, from_d, to_d, interval_min)
+        if isinstance(hit, BaseException):
+            raise hit
+        return hit
+
+
+def prefetch_scan(sids, index_fut_ids, scan_from, scan_to):
+    """
+    Every REST request of one polling sweep at once, in one asyncio loop:
+    base bars for `sids` (FUTSTK) and `index_fut_ids` (FUTIDX), previous
+    closes and the index quote. Requests still running after
+    ASYNC_FETCH_TIMEOUT_SECONDS are cancelled (those securities fail this
+    sweep). Returns (PrefetchedBars, index quotes as index_quotes() has them).
+    """
+    return asyncio.run(_prefetch_scan(sids, index_fut_ids, scan_from, scan_to))
+
+
+async def _prefetch_scan(sids, index_fut_ids, scan_from, scan_to):
+    spot_ids = [info["id"] for info in INDEX_MAP.values()]
+    jobs = [(sid, "FUTSTK") for sid in sids] + [(sid, "FUTIDX") for sid in index_fut_ids]
+    async with AsyncDhanClient() as client:
+        results = await gather_with_timeout(
+            [client.ltps("IDX_I", spot_ids)]
+            + [get_prev_close_index_async(client, sid) for sid in spot_ids]
+            + [get_prev_close_async(client, sid) for sid in sids]
+            + [
+                fetch_bars_incremental_async(
+                    client, sid, inst, scan_from, scan_to, BASE_INTERVAL_MIN
+                )
+                for sid, inst in jobs
+            ],
+            ASYNC_FETCH_TIMEOUT_SECONDS,
+        )
+    ltps = results[0] if isinstance(results[0], dict) else dict.fromkeys(spot_ids, 0.0)
+    cache_ltps("IDX_I", ltps)
+    closes = [c if isinstance(c, float) else 0.0 for c in results[1 : 1 + len(spot_ids)]]
+    bars = dict(zip((str(sid) for sid, _ in jobs), results[len(results) - len(jobs) :]))
+    return PrefetchedBars(bars), (ltps, dict(zip(spot_ids, closes)))
+
+
+def scan_index_summary(index_fut_map, scan_from, scan_to, today, fetch=None, quotes=None):
+    """
+    Spot + FUTIDX tech + OI rows for the index table (`quotes`: an
+    index_quotes() result to reuse, else fetched here).
+    """
+    index_rows = []
+    ltps, prev_closes = quotes or index_quotes()
+    for key, info in INDEX_MAP.items():
+        spot_id = info["id"]
+        name = info["name"]
+
+        prev_close_idx = prev_closes.get(spot_id, 0.0)
+        ltp_idx = ltps.get(spot_id, 0.0)
+        if prev_close_idx > 0 and ltp_idx > 0:
+            day_pct = round(((ltp_idx - prev_close_idx) / prev_close_idx) * 100, 2)
+        else:
+            day_pct = 0.0
+
+        fut_id = index_fut_map.get(key)
+
+        fut_ltp = 0.0
+        mom = 0.0
+        p_chg = 0.0
+        rsi_val = 0.0
+        adx_val = 0.0
+        vol_ratio = 1.0
+        oi_chg = 0.0
+        oi_signal = "No OI Data ❔"
+        analysis = "Neutral ⚪"
+        bias = "Neutral"
+
+        if fut_id:
+            df_idx = fetch_intraday_v2_futidx(
+                fut_id, scan_from, scan_to, interval_min=SCAN_INTERVAL_MIN, fetch=fetch
+            )
+            if not df_idx.empty:
+                rsi_now, adx_now, ema_now = INDICATORS.update(
+                    (fut_id, SCAN_INTERVAL_MIN), df_idx
+                )
+                if len(df_idx) >= RSI_LEN:
+                    rsi_val = float(rsi_now)
+                    adx_val = float(adx_now)
+
+                if len(df_idx) >= EMA_LEN:
+                    mom = round(
+                        ((df_idx["Close"].iloc[-1] - ema_now) / ema_now) * 100,
+                        2,
+                    )
+
+                curr_vol = float(df_idx["Volume"].iloc[-1])
+                avg_vol = (
+                    df_idx["Volume"].rolling(10).mean().iloc[-1]
+                    if len(df_idx) > 10
+                    else curr_vol
+                )
+                vol_ratio = (curr_vol / avg_vol) if avg_vol > 0 else 1.0
+
+                curr = df_idx.iloc[-1]
+                fut_ltp = float(curr["Close"])
+
+                if len(df_idx) > 1:
+                    prev_bar = df_idx.iloc[-2]
+                    p_chg = round(
+                        ((fut_ltp - prev_bar["Close"]) / prev_bar["Close"]) * 100,
+                        2,
+                    )
+
+                oi_available = not (
+                    df_idx["OI"].max() == 0 and df_idx["OI"].min() == 0
+                )
+                if oi_available:
+                    day_df = df_idx[df_idx["datetime"].dt.date == today]
+                    if len(day_df) >= 2:
+                        d_first = day_df.iloc[0]
+                        d_last = day_df.iloc[-1]
+                        oi_start = float(d_first.get("OI", 0) or 0)
+                        oi_end = float(d_last.get("OI", 0) or 0)
+                        if oi_start > 0:
+                            oi_chg = round(
+                                ((oi_end - oi_start) / oi_start) * 100, 2
+                            )
+                        else:
+                            oi_chg = 0.0
+
+                    oi_signal = get_oi_signal(oi_chg, day_pct)
+                else:
+                    oi_signal = "No OI Data ❔"
+
+                analysis = get_trend_analysis(p_chg, vol_ratio)
+
+                if "Buildup" in oi_signal:
+                    if day_pct > 0.3:
+                        bias = "Bull"
+                    elif day_pct < -0.3:
+                        bias = "Bear"
+
+        index_rows.append(
+            {
+                "Index": name,
+                "LTP": round(fut_ltp or ltp_idx, 2),
+                "Mom %": mom,
+                "Price Chg%": p_chg,
+                "Day Price%": day_pct,
+                "RSI": round(rsi_val, 1),
+                "ADX": round(adx_val, 1),
+                "Vol Ratio": round(vol_ratio, 1),
+                "OI Chg%": oi_chg,
+                "OI Signal": oi_signal,
+                "Analysis": analysis,
+                "Bias": bias,
+            }
+        )
+    return index_rows
+
+
+def _debug_checks(fno_map, index_fut_map):
+    """
+    Debug-panel payload, built from bars already cached by this scan:
+    [(kind, label, value)] with kind "caption" or "table". The indicator
+    check runs on a throwaway engine, so the scan's shared INDICATORS state
+    is left alone.
+    """
+    debug = []
+    try:
+        nfut_id = index_fut_map.get("NIFTY")
+        if nfut_id:
+            df_n = resample_bars(BAR_STORE.get(nfut_id, BASE_INTERVAL_MIN), SCAN_INTERVAL_MIN)
+            if df_n is not None and not df_n.empty:
+                debug.append(
+                    ("table", "NIFTY FUT OI (last 10 bars):", df_n[["datetime", "OI"]].tail(10))
+                )
+
+        sample_sym = next(iter(fno_map.keys()))
+        sfut_id = fno_map[sample_sym]["id"]
+        df_s = resample_bars(BAR_STORE.get(sfut_id, BASE_INTERVAL_MIN), SCAN_INTERVAL_MIN)
+        if df_s is not None and not df_s.empty:
+            debug.append(
+                ("table", f"{sample_sym} FUT OI (last 10 bars):", df_s[["datetime", "OI"]].tail(10))
+            )
+            if len(df_s) >= RSI_LEN:
+                # incremental engine vs full pandas_ta recompute
+                inc = IndicatorEngine().update((sfut_id, SCAN_INTERVAL_MIN), df_s)
+                full = (
+                    ta.rsi(df_s["Close"], RSI_LEN).iloc[-1],
+                    ta.adx(df_s["High"], df_s["Low"], df_s["Close"], ADX_LEN)[
+                        f"ADX_{ADX_LEN}"
+                    ].iloc[-1],
+                    ta.ema(df_s["Close"], EMA_LEN).iloc[-1],
+                )
+                debug.append(
+                    (
+                        "caption",
+                        f"{sample_sym} RSI/ADX/EMA incremental {inc} vs pandas_ta {full}",
+                        None,
+                    )
+                )
+    except Exception as e:
+        log_error(f"Debug OI check failed: {e}", "debug")
+    return debug
+
+
+def run_scan(
+    now_scan,
+    on_progress=None,
+    universe=None,
+    fetch=fetch_bars_incremental,
+    planner=PLANNER,
+    table=SCAN_TABLE,
+    debug=False,
+):
+    """
+    One sweep: index summary + every FUTSTK in the universe, scored in
+    batch. `universe` is (fno_map, index_fut_map), by default the current
+    master file. `fetch` supplies the bars (REST polling by default, issued
+    up front in one asyncio loop when ASYNC_FETCH is on; LiveFeed.bars in
+    streaming mode). `planner` picks which symbols are due
+    (None: all of them); the rest reuse their last metrics. Results are
+    written in place into `table` (a ScanTable). `debug` adds the debug
+    panel's self-checks to the snapshot. Returns the snapshot dict the app
+    renders / write_snapshot persists; its bull / bear / all_data are
+    DataFrames.
+    """
+    started = time.perf_counter()
+    fno_map, index_fut_map = universe or get_universe()
+    scan_to = now_scan.strftime("%Y-%m-%d")
+    scan_from = (now_scan - timedelta(days=5)).strftime("%Y-%m-%d")
+    today = now_scan.date()
+    symbols = list(fno_map.keys())
+    table.ensure(symbols)
+    if planner is not None:
+        targets, full = planner.plan(symbols, now_scan)
+    else:
+        targets, full = symbols, True
+
+    quotes = None
+    if ASYNC_FETCH and fetch is fetch_bars_incremental:
+        with stage("prefetch"):
+            fetch, quotes = prefetch_scan(
+                [fno_map[sym]["id"] for sym in targets],
+                [fid for fid in index_fut_map.values() if fid],
+                scan_from,
+                scan_to,
+            )
+
+    with stage("index_summary"):
+        index_rows = scan_index_summary(
+            index_fut_map, scan_from, scan_to, today, fetch, quotes
+        )
+
+    syms, metrics = [], []
+    scanned = set()
+    debug_rows = []
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+        futures = {
+            pool.submit(
+                scan_symbol, fno_map[sym]["id"], scan_from, scan_to, today, fetch
+            ): sym
+            for sym in targets
+        }
+        for fut in as_completed(futures):
+            sym = futures[fut]
+            done += 1
+            try:
+                m = fut.result()
+                scanned.add(sym)
+                if planner is not None:
+                    planner.record(sym, m, now_scan)
+                if m is not None:
+                    syms.append(sym)
+                    metrics.append(m)
+            except Exception as e:
+                log_error(f"Error while scanning {sym}: {e}", "scan_symbol")
+
+            if on_progress:
+                on_progress(done / len(targets))
+
+    if planner is not None:
+        # Not due (or failed this time): keep the last good metrics.
+        for sym in symbols:
+            m = None if sym in scanned else planner.cached(sym)
+            if m is not None:
+                syms.append(sym)
+                metrics.append(m)
+        debug_rows.append(
+            (
+                "caption",
+                f"Refreshed {len(targets)}/{len(symbols)} symbols, "
+                f"hot tier {planner.tiers()[0]}"
+                + (" (full refresh after candle close)" if full else " (adaptive cadence)"),
+                None,
+            )
+        )
+
+    if metrics:
+        with stage("scoring"):
+            cols = {k: np.array([m[k] for m in metrics]) for k in metrics[0]}
+            oi_signal = batch_oi_signal(
+                cols["oi_chg"], cols["day_price_chg"], cols["oi_available"]
+            )
+            analysis = batch_trend_analysis(cols["p_chg"], cols["vol_ratio"])
+            side = batch_signal_side(
+                cols["rsi"],
+                cols["vol_ratio"],
+                cols["oi_available"],
+                oi_signal,
+                cols["day_price_chg"],
+                cols["p_chg"],
+            )
+
+            strength = np.zeros(len(syms))
+            for sig in ("bull", "bear"):
+                idx = np.flatnonzero(side == sig)
+                minutes = SIGNAL_HISTORY.update(sig, [syms[i] for i in idx], now_scan)
+                strength[idx] = [minutes[syms[i]] for i in idx]
+
+            score_args = (
+                side,
+                cols["rsi"],
+                cols["adx"],
+                cols["mom"],
+                cols["vol_ratio"],
+                cols["oi_chg"],
+                oi_signal,
+                strength,
+                cols["day_price_chg"],
+                cols["p_chg"],
+            )
+            conv, t_s, p_s, s_s = batch_conviction(*score_args)
+            tf_agree = batch_timeframe_confirm(
+                side,
+                [cols[f"rsi_{m}"] for m in CONFIRM_INTERVALS],
+                [cols[f"mom_{m}"] for m in CONFIRM_INTERVALS],
+            )
+
+            flagged = side != ""
+            if planner is not None:
+                ranked = np.flatnonzero(flagged)[np.argsort(-conv[flagged], kind="stable")]
+                planner.set_hot([syms[i] for i in ranked])
+        if debug:
+            with stage("parity_check"):
+                bad = check_batch_parity(*(np.asarray(a)[flagged] for a in score_args))
+            debug_rows.append(("caption", f"Batch vs scalar conviction mismatches: {bad}", None))
+
+        n_tf = len(CONFIRM_INTERVALS)
+        columns = {
+            "LTP": np.round(cols["ltp"], 2),
+            "Mom %": cols["mom"],
+            "Price Chg%": cols["p_chg"],
+            "Day Price%": cols["day_price_chg"],
+            "RSI": np.round(cols["rsi"], 1),
+            "ADX": np.round(cols["adx"], 1),
+            "Vol Ratio": np.round(cols["vol_ratio"], 1),
+            "OI Chg%": cols["oi_chg"],
+            "OI Signal": oi_signal,
+            "Analysis": analysis,
+            "side": side,
+            "Strength (min)": strength,
+            "TrendScore": t_s,
+            "PartScore": p_s,
+            "PersistScore": s_s,
+            "Conviction": conv,
+            "TF Confirm": [f"{a}/{n_tf}" if f else "" for a, f in zip(tf_agree, flagged)],
+        }
+        for m in CONFIRM_INTERVALS:
+            columns[f"RSI {m}m"] = np.round(cols[f"rsi_{m}"], 1)
+            columns[f"Mom {m}m %"] = cols[f"mom_{m}"]
+    else:
+        columns = {}
+    table.update(syms, columns)
+    bull, bear, all_data = table.views()
+
+    if debug:
+        debug_rows.extend(_debug_checks(fno_map, index_fut_map))
+    snapshot = {
+        "time": now_scan,
+        "index_rows": index_rows,
+        "bull": bull,
+        "bear": bear,
+        "all_data": all_data,
+        "debug": debug_rows,
+    }
+    record_scan(snapshot, time.perf_counter() - started)
+    return snapshot
+
+
+class ScanEngine:
+    """
+    One background scan loop per process. Every session's scanner fragment
+    just reads `snapshot`, so Dhan load and CPU stay flat as viewers grow.
+    Sweeps pause when no fragment has looked at the engine for a while, and
+    outside NSE sessions (`clock`), where the last snapshot is served frozen;
+    a process started while closed still takes one sweep to have something
+    to show. Sweeps carry the debug payload only while some session has its
+    debug panel open.
+    """
+
+    IDLE_AFTER_SECONDS = 120
+
+    def __init__(
+        self, scan_fn=run_scan, gap_seconds=MIN_SCAN_GAP_SECONDS, clock=MARKET, history=None
+    ):
+        self.scan_fn = scan_fn
+        self.gap_seconds = gap_seconds
+        self.clock = clock
+        self.history = history  # ScanHistoryWriter: every published snapshot is appended
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.scanning = False
+        self.progress = 0.0
+        self.last_viewed = 0.0
+        self.last_debug = None
+        self.thread = None
+
+    def touch(self, debug=False):
+        self.last_viewed = time.monotonic()
+        if debug:
+            self.last_debug = self.last_viewed
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self._loop, name="scan-engine", daemon=True
+                )
+                self.thread.start()
+
+    def _set_progress(self, frac):
+        self.progress = frac
+
+    def _loop(self):
+        last_start = None
+        while True:
+            now = time.monotonic()
+            watched = now - self.last_viewed < self.IDLE_AFTER_SECONDS
+            debug = (
+                self.last_debug is not None
+                and now - self.last_debug < self.IDLE_AFTER_SECONDS
+            )
+            due = last_start is None or now - last_start >= self.gap_seconds
+            live = self.clock is None or self.clock.is_active() or self.snapshot is None
+            if watched and due and live:
+                last_start = now
+                self.scanning = True
+                try:
+                    self.snapshot = self.scan_fn(
+                        datetime.now(IST), on_progress=self._set_progress, debug=debug
+                    )
+                    if self.history is not None:
+                        self.history.append(self.snapshot)
+                except Exception as e:
+                    SCANS.inc("failed")
+                    log_error(f"Scan failed: {e}", "scan")
+                finally:
+                    self.scanning = False
+                    self.progress = 0.0
+            time.sleep(1)
+
+
+SNAPSHOT_TABLES = (("index", "index_rows"), ("bull", "bull"), ("bear", "bear"), ("all", "all_data"))
+STOCK_TABLE_COLUMNS = {"bull": SIGNAL_COLUMNS, "bear": SIGNAL_COLUMNS, "all": ALL_COLUMNS}
+
+
+def write_snapshot(snapshot, path):
+    """
+    Persist a run_scan() snapshot as one Parquet file (a `_table` column
+    tells the tables apart). Written to a temp file and renamed, so readers
+    never see a half-written snapshot.
+    """
+    frames = [pd.DataFrame({"_table": ["meta"], "_scan_time": [snapshot["time"]]})]
+    for table, key in SNAPSHOT_TABLES:
+        df = pd.DataFrame(snapshot[key])
+        df.insert(0, "_table", table)
+        frames.append(df)
+    out = pd.concat(frames, ignore_index=True)
+    tmp = f"{path}.tmp"
+    out.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path):
+    """Inverse of write_snapshot(): the snapshot dict (without debug payload)."""
+    df = pd.read_parquet(path)
+    meta = df[df["_table"] == "meta"].iloc[0]
+    snapshot = {
+        "time": pd.Timestamp(meta["_scan_time"]).tz_convert(IST).to_pydatetime(),
+        "debug": [],
+    }
+    for table, key in SNAPSHOT_TABLES:
+        sub = df[df["_table"] == table].drop(columns=["_table", "_scan_time"])
+        if table in STOCK_TABLE_COLUMNS:
+            sub = sub.reindex(columns=STOCK_TABLE_COLUMNS[table])
+            snapshot[key] = sub.reset_index(drop=True)
+        else:
+            snapshot[key] = sub.dropna(axis=1, how="all").to_dict("records")
+    return snapshot
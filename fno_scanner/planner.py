@@ -0,0 +1,132 @@
+"""
+Per-symbol scan cadence. run_scan asks the planner which symbols are due and
+reuses the last metrics for the rest, so quiet symbols cost fewer requests
+while moving ones stay fresh.
+"""
+import math
+import threading
+
+from .config import (
+    CANDLE_SETTLE_SECONDS,
+    FULL_REFRESH_EVERY_MIN,
+    HOT_MOVE_PCT,
+    HOT_OI_MOVE_PCT,
+    HOT_TIER_MAX,
+    MAX_SYMBOL_GAP_SECONDS,
+    MIN_SCAN_GAP_SECONDS,
+    TAIL_ROTATION_SWEEPS,
+)
+from .stores import bucket_start
+
+
+class SymbolCadence:
+    __slots__ = ("gap", "next_due", "ltp", "oi_chg", "metrics")
+
+    def __init__(self, gap):
+        self.gap = gap
+        self.next_due = 0.0
+        self.ltp = None
+        self.oi_chg = None
+        self.metrics = None
+
+
+class ScanPlanner:
+    """
+    Adaptive cadence: a symbol whose price (HOT_MOVE_PCT) or intraday OI
+    change (HOT_OI_MOVE_PCT) moved since its last refresh is rescanned after
+    `min_gap`; every quiet refresh doubles its gap up to `max_gap`. Every
+    symbol is refreshed right after each FULL_REFRESH_EVERY_MIN candle close
+    (09:15 aligned, plus a settle delay), when all bars actually change.
+
+    Tiers: the hot tier (current bull / bear names, best conviction first)
+    is refreshed every sweep and submitted first; the long tail only takes
+    1/`tail_sweeps` of its symbols per sweep, most overdue first.
+    """
+
+    def __init__(
+        self,
+        min_gap=MIN_SCAN_GAP_SECONDS,
+        max_gap=MAX_SYMBOL_GAP_SECONDS,
+        move_pct=HOT_MOVE_PCT,
+        oi_move_pct=HOT_OI_MOVE_PCT,
+        full_every_min=FULL_REFRESH_EVERY_MIN,
+        settle_seconds=CANDLE_SETTLE_SECONDS,
+        hot_max=HOT_TIER_MAX,
+        tail_sweeps=TAIL_ROTATION_SWEEPS,
+    ):
+        self.min_gap = min_gap
+        self.max_gap = max_gap
+        self.move_pct = move_pct
+        self.oi_move_pct = oi_move_pct
+        self.full_every_min = full_every_min
+        self.settle_seconds = settle_seconds
+        self.hot_max = hot_max
+        self.tail_sweeps = tail_sweeps
+        self.lock = threading.Lock()
+        self.state = {}
+        self.hot = []
+        self.last_full_bucket = None
+
+    def plan(self, symbols, now):
+        """(symbols to refresh, hot tier first; full_refresh) for a sweep at `now`."""
+        t = now.timestamp()
+        bucket = bucket_start(int(t - self.settle_seconds), self.full_every_min)
+        with self.lock:
+            known = set(symbols)
+            hot = [s for s in self.hot if s in known]
+            hot_set = set(hot)
+            tail = [s for s in symbols if s not in hot_set]
+            full = bucket != self.last_full_bucket
+            if full:
+                self.last_full_bucket = bucket
+                return hot + tail, True
+
+            never = [s for s in tail if s not in self.state]
+            due = sorted(
+                (s for s in tail if s in self.state and self.state[s].next_due <= t),
+                key=lambda s: self.state[s].next_due,
+            )
+            quota = math.ceil(len(tail) / self.tail_sweeps)
+        return hot + never + due[:quota], False
+
+    def set_hot(self, ranked):
+        """Hot tier for the next sweeps: flagged symbols, best conviction first."""
+        with self.lock:
+            self.hot = list(ranked)[: self.hot_max]
+
+    def record(self, symbol, metrics, now):
+        """Store a fresh result (None: no candles) and schedule the next refresh."""
+        t = now.timestamp()
+        with self.lock:
+            c = self.state.get(symbol)
+            if c is None:
+                c = self.state[symbol] = SymbolCadence(self.min_gap)
+            if metrics is None:
+                c.gap = self.max_gap
+            else:
+                moved = c.ltp is None
+                if c.ltp:
+                    moved = abs(metrics["ltp"] - c.ltp) / c.ltp * 100 >= self.move_pct
+                if c.oi_chg is not None and abs(metrics["oi_chg"] - c.oi_chg) >= self.oi_move_pct:
+                    moved = True
+                c.gap = self.min_gap if moved else min(self.max_gap, c.gap * 2)
+                c.ltp = metrics["ltp"]
+                c.oi_chg = metrics["oi_chg"]
+            c.metrics = metrics
+            c.next_due = t + c.gap
+
+    def cached(self, symbol):
+        with self.lock:
+            c = self.state.get(symbol)
+            return c.metrics if c is not None else None
+
+    def gaps(self):
+        with self.lock:
+            return {s: c.gap for s, c in self.state.items()}
+
+    def tiers(self):
+        with self.lock:
+            return len(self.hot), len(self.state)
+
+
+PLANNER = ScanPlanner()
@@ -0,0 +1,327 @@
+"""
+Sentiment / OI labels, signal persistence and conviction scoring, in scalar
+(reference) and whole-universe NumPy batch form.
+"""
+import numpy as np
+
+
+def get_trend_analysis(price_chg, vol_ratio):
+    if price_chg > 0 and vol_ratio > 1.2:
+        return "Bullish (Vol) 🟢"
+    if price_chg < 0 and vol_ratio > 1.2:
+        return "Bearish (Vol) 🔴"
+    if price_chg > 0:
+        return "Mild Bullish ↗️"
+    if price_chg < 0:
+        return "Mild Bearish ↘️"
+    return "Neutral ⚪"
+
+def get_oi_signal(oi_chg, day_price_chg):
+    if oi_chg > 2 and day_price_chg > 0.5:
+        return "Long Buildup 🟢"
+    if oi_chg > 2 and day_price_chg < -0.5:
+        return "Short Buildup 🔴"
+    if oi_chg < -2 and day_price_chg > 0.5:
+        return "Short Covering 🟡"
+    if oi_chg < -2 and day_price_chg < -0.5:
+        return "Long Unwinding 🟠"
+    return "No Clear OI ⚪"
+
+# --- CONVICTION SCORING ---
+def get_trend_score(side, rsi, adx, mom):
+    score = 0
+    if adx > 30:
+        score += 18
+    elif adx > 25:
+        score += 14
+    elif adx > 20:
+        score += 8
+
+    if side == "bull":
+        if 50 <= rsi <= 65:
+            score += 15
+        elif 45 <= rsi < 50 or 65 < rsi <= 70:
+            score += 8
+        if mom > 0.7:
+            score += 7
+        elif mom > 0.3:
+            score += 4
+    else:
+        if 35 <= rsi <= 50:
+            score += 15
+        elif 30 <= rsi < 35 or 50 < rsi <= 60:
+            score += 8
+        if mom < -0.7:
+            score += 7
+        elif mom < -0.3:
+            score += 4
+
+    if rsi > 75 or rsi < 25:
+        score -= 5
+    return max(0, min(score, 40))
+
+def get_participation_score(vol_ratio, oi_chg, oi_signal):
+    score = 0
+    if vol_ratio >= 2.0:
+        score += 15
+    elif vol_ratio >= 1.5:
+        score += 10
+    elif vol_ratio >= 1.2:
+        score += 5
+
+    if "Buildup" in oi_signal:
+        if abs(oi_chg) >= 8:
+            score += 15
+        elif abs(oi_chg) >= 5:
+            score += 10
+        elif abs(oi_chg) >= 2:
+            score += 5
+    elif "Unwinding" in oi_signal or "Covering" in oi_signal:
+        score -= 5
+
+    return max(0, min(score, 30))
+
+def get_persistence_score(strength_min, day_price_chg, p_chg):
+    score = 0
+    if strength_min >= 90:
+        score += 15
+    elif strength_min >= 60:
+        score += 11
+    elif strength_min >= 30:
+        score += 7
+    elif strength_min >= 15:
+        score += 4
+
+    if abs(day_price_chg) >= 2 and (
+        (day_price_chg > 0 and p_chg > 0)
+        or (day_price_chg < 0 and p_chg < 0)
+    ):
+        score += 10
+    elif abs(day_price_chg) >= 1:
+        score += 6
+
+    if abs(p_chg) < 0.1:
+        score -= 3
+
+    return max(0, min(score, 30))
+
+def compute_conviction(
+    side,
+    rsi,
+    adx,
+    mom,
+    vol_ratio,
+    oi_chg,
+    oi_signal,
+    strength_min,
+    day_price_chg,
+    p_chg,
+):
+    t_score = get_trend_score(side, rsi, adx, mom)
+    p_score = get_participation_score(vol_ratio, oi_chg, oi_signal)
+    s_score = get_persistence_score(strength_min, day_price_chg, p_chg)
+    total = t_score + p_score + s_score
+    return min(100, total), t_score, p_score, s_score
+
+# Batch (whole-universe) versions of the scalar helpers above. Inputs are
+# equal-length arrays, one slot per symbol; the scalar functions remain the
+# reference implementation (see check_batch_parity).
+
+# Thresholds of the batch scorers. The defaults are the scalar rules above;
+# the optimizer sweeps alternatives (RSI bands: outer lo, core lo, core hi, outer hi).
+CONVICTION_PARAMS = {
+    "oi_chg": 2.0,  # get_oi_signal: |OI Chg%| beyond this ...
+    "oi_price": 0.5,  # ... with |Day Price%| beyond this
+    "adx": (20, 25, 30),
+    "bull_rsi": (45, 50, 65, 70),
+    "bear_rsi": (30, 35, 50, 60),
+    "vol_ratio": (1.2, 1.5, 2.0),
+    "oi_tiers": (2, 5, 8),
+}
+
+def batch_trend_analysis(price_chg, vol_ratio):
+    price_chg = np.asarray(price_chg, dtype=float)
+    vol_ratio = np.asarray(vol_ratio, dtype=float)
+    return np.select(
+        [
+            (price_chg > 0) & (vol_ratio > 1.2),
+            (price_chg < 0) & (vol_ratio > 1.2),
+            price_chg > 0,
+            price_chg < 0,
+        ],
+        ["Bullish (Vol) 🟢", "Bearish (Vol) 🔴", "Mild Bullish ↗️", "Mild Bearish ↘️"],
+        default="Neutral ⚪",
+    )
+
+def batch_oi_signal(oi_chg, day_price_chg, oi_available=None, params=CONVICTION_PARAMS):
+    oi_chg = np.asarray(oi_chg, dtype=float)
+    day_price_chg = np.asarray(day_price_chg, dtype=float)
+    oi_cut = params["oi_chg"]
+    price_cut = params["oi_price"]
+    labels = np.select(
+        [
+            (oi_chg > oi_cut) & (day_price_chg > price_cut),
+            (oi_chg > oi_cut) & (day_price_chg < -price_cut),
+            (oi_chg < -oi_cut) & (day_price_chg > price_cut),
+            (oi_chg < -oi_cut) & (day_price_chg < -price_cut),
+        ],
+        ["Long Buildup 🟢", "Short Buildup 🔴", "Short Covering 🟡", "Long Unwinding 🟠"],
+        default="No Clear OI ⚪",
+    ).astype(object)
+    if oi_available is not None:
+        labels[~np.asarray(oi_available, dtype=bool)] = "No OI Data ❔"
+    return labels
+
+def _is_buildup(oi_signal):
+    return np.char.find(np.asarray(oi_signal, dtype=str), "Buildup") >= 0
+
+def _rsi_band_score(rsi, band):
+    out_lo, lo, hi, out_hi = band
+    return np.select(
+        [(rsi >= lo) & (rsi <= hi), ((rsi >= out_lo) & (rsi < lo)) | ((rsi > hi) & (rsi <= out_hi))],
+        [15, 8],
+        default=0,
+    )
+
+def batch_trend_score(side, rsi, adx, mom, params=CONVICTION_PARAMS):
+    bull = np.asarray(side) == "bull"
+    rsi = np.asarray(rsi, dtype=float)
+    adx = np.asarray(adx, dtype=float)
+    mom = np.asarray(mom, dtype=float)
+
+    adx_lo, adx_mid, adx_hi = params["adx"]
+    score = np.select([adx > adx_hi, adx > adx_mid, adx > adx_lo], [18, 14, 8], default=0)
+    score = score + np.where(
+        bull,
+        _rsi_band_score(rsi, params["bull_rsi"])
+        + np.select([mom > 0.7, mom > 0.3], [7, 4], default=0),
+        _rsi_band_score(rsi, params["bear_rsi"])
+        + np.select([mom < -0.7, mom < -0.3], [7, 4], default=0),
+    )
+    score = score - np.where((rsi > 75) | (rsi < 25), 5, 0)
+    return np.clip(score, 0, 40)
+
+def batch_participation_score(vol_ratio, oi_chg, oi_signal, params=CONVICTION_PARAMS):
+    vol_ratio = np.asarray(vol_ratio, dtype=float)
+    abs_oi = np.abs(np.asarray(oi_chg, dtype=float))
+    sig = np.asarray(oi_signal, dtype=str)
+
+    vol_lo, vol_mid, vol_hi = params["vol_ratio"]
+    oi_lo, oi_mid, oi_hi = params["oi_tiers"]
+    score = np.select(
+        [vol_ratio >= vol_hi, vol_ratio >= vol_mid, vol_ratio >= vol_lo], [15, 10, 5], default=0
+    )
+    score = score + np.select(
+        [
+            _is_buildup(sig) & (abs_oi >= oi_hi),
+            _is_buildup(sig) & (abs_oi >= oi_mid),
+            _is_buildup(sig) & (abs_oi >= oi_lo),
+            ~_is_buildup(sig)
+            & ((np.char.find(sig, "Unwinding") >= 0) | (np.char.find(sig, "Covering") >= 0)),
+        ],
+        [15, 10, 5, -5],
+        default=0,
+    )
+    return np.clip(score, 0, 30)
+
+def batch_persistence_score(strength_min, day_price_chg, p_chg):
+    strength_min = np.asarray(strength_min, dtype=float)
+    day = np.asarray(day_price_chg, dtype=float)
+    p_chg = np.asarray(p_chg, dtype=float)
+
+    score = np.select(
+        [strength_min >= 90, strength_min >= 60, strength_min >= 30, strength_min >= 15],
+        [15, 11, 7, 4],
+        default=0,
+    )
+    aligned = ((day > 0) & (p_chg > 0)) | ((day < 0) & (p_chg < 0))
+    score = score + np.select(
+        [(np.abs(day) >= 2) & aligned, np.abs(day) >= 1], [10, 6], default=0
+    )
+    score = score - np.where(np.abs(p_chg) < 0.1, 3, 0)
+    return np.clip(score, 0, 30)
+
+def batch_conviction(
+    side,
+    rsi,
+    adx,
+    mom,
+    vol_ratio,
+    oi_chg,
+    oi_signal,
+    strength_min,
+    day_price_chg,
+    p_chg,
+    params=CONVICTION_PARAMS,
+):
+    t_score = batch_trend_score(side, rsi, adx, mom, params)
+    p_score = batch_participation_score(vol_ratio, oi_chg, oi_signal, params)
+    s_score = batch_persistence_score(strength_min, day_price_chg, p_chg)
+    return np.minimum(100, t_score + p_score + s_score), t_score, p_score, s_score
+
+def batch_signal_side(rsi, vol_ratio, oi_available, oi_signal, day_price_chg, p_chg):
+    """
+    Bull / bear entry rules of the scanner for the whole universe.
+    Returns an object array of "bull", "bear" or "" per symbol.
+    """
+    rsi = np.asarray(rsi, dtype=float)
+    vol_ratio = np.asarray(vol_ratio, dtype=float)
+    day = np.asarray(day_price_chg, dtype=float)
+    p_chg = np.asarray(p_chg, dtype=float)
+    oi_led = np.asarray(oi_available, dtype=bool) & _is_buildup(oi_signal)
+
+    bull = np.where(
+        oi_led,
+        (day > 0) & (p_chg > 0),
+        (rsi > 0) & (p_chg > 0.3) & (rsi > 55) & (vol_ratio > 1.1),
+    )
+    bear = np.where(
+        oi_led,
+        (day < 0) & (p_chg < 0),
+        (rsi > 0) & (p_chg < -0.3) & (rsi < 52) & (vol_ratio > 1.1),
+    )
+    return np.select([bull, bear], ["bull", "bear"], default="").astype(object)
+
+def batch_timeframe_confirm(side, rsis, moms):
+    """
+    How many confirmation timeframes agree with each signal: RSI on the
+    signal's side of 50 and momentum in its direction. `rsis` / `moms` are
+    one array per timeframe.
+    """
+    side = np.asarray(side, dtype=object)
+    agree = np.zeros(len(side), dtype=int)
+    for rsi, mom in zip(rsis, moms):
+        rsi = np.asarray(rsi, dtype=float)
+        mom = np.asarray(mom, dtype=float)
+        agree += ((side == "bull") & (rsi > 50) & (mom > 0)) | (
+            (side == "bear") & (rsi > 0) & (rsi < 50) & (mom < 0)
+        )
+    return agree
+
+def check_batch_parity(
+    side,
+    rsi,
+    adx,
+    mom,
+    vol_ratio,
+    oi_chg,
+    oi_signal,
+    strength_min,
+    day_price_chg,
+    p_chg,
+):
+    """Count symbols whose batch conviction differs from compute_conviction."""
+    batch = np.column_stack(
+        batch_conviction(
+            side, rsi, adx, mom, vol_ratio, oi_chg, oi_signal,
+            strength_min, day_price_chg, p_chg,
+        )
+    )
+    mismatches = 0
+    for i in range(len(side)):
+        ref = compute_conviction(
+            side[i], rsi[i], adx[i], mom[i], vol_ratio[i], oi_chg[i], oi_signal[i],
+            strength_min[i], day_price_chg[i], p_chg[i],
+        )
+        mismatches += tuple(int(v) for v in batch[i]) != tuple(ref)
+    return mismatches
@@ -0,0 +1,398 @@
+"""
+On-disk (SQLite) + in-memory caches shared by every scan in the process:
+previous-day closes, bull / bear signal history and incremental intraday bars.
+"""
+import asyncio
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .config import BASE_INTERVAL_MIN, CACHE_DB_PATH, IST
+from .dhan import (
+    PREV_CLOSE_FUTSTK,
+    PREV_CLOSE_INDEX,
+    _fetch_prev_close_futstk,
+    _fetch_prev_close_index,
+    _post_intraday_v2,
+    epoch_to_ist,
+    log_error,
+)
+
+
+class PrevCloseStore:
+    """
+    Previous-day closes keyed by (segment, security_id, trade_date), kept in
+    memory and in SQLite so every fragment, session and restart on the same
+    trading day reuses one fetch per instrument.
+    """
+
+    KEEP_DAYS = 10
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.mem = {}
+        self.loaded_day = None
+        cutoff = (datetime.now(IST) - timedelta(days=self.KEEP_DAYS)).strftime("%Y-%m-%d")
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS prev_close ("
+                " segment TEXT NOT NULL,"
+                " security_id TEXT NOT NULL,"
+                " trade_date TEXT NOT NULL,"
+                " close REAL NOT NULL,"
+                " PRIMARY KEY (segment, security_id, trade_date))"
+            )
+            self.conn.execute("DELETE FROM prev_close WHERE trade_date < ?", (cutoff,))
+
+    def load_day(self, trade_date):
+        # New trading day: drop yesterday's entries and warm up from disk.
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT segment, security_id, close FROM prev_close WHERE trade_date = ?",
+                (trade_date,),
+            ).fetchall()
+            self.mem = {(seg, sid, trade_date): close for seg, sid, close in rows}
+            self.loaded_day = trade_date
+
+    def get(self, segment, security_id, trade_date):
+        if self.loaded_day != trade_date:
+            self.load_day(trade_date)
+        return self.mem.get((segment, str(security_id), trade_date))
+
+    def put(self, segment, security_id, trade_date, close):
+        key = (segment, str(security_id), trade_date)
+        with self.lock, self.conn:
+            self.mem[key] = close
+            self.conn.execute(
+                "INSERT OR REPLACE INTO prev_close VALUES (?, ?, ?, ?)",
+                (segment, str(security_id), trade_date, float(close)),
+            )
+
+
+PREV_CLOSE_STORE = PrevCloseStore(CACHE_DB_PATH)
+
+
+def _cached_prev_close(segment, security_id, fetch):
+    trade_date = datetime.now(IST).strftime("%Y-%m-%d")
+    cached = PREV_CLOSE_STORE.get(segment, security_id, trade_date)
+    if cached is not None:
+        return cached
+    close = fetch(security_id)
+    if close > 0:  # never cache a failed lookup
+        PREV_CLOSE_STORE.put(segment, security_id, trade_date, close)
+    return close
+
+
+def get_prev_close_index(security_id):
+    return _cached_prev_close("IDX_I", security_id, _fetch_prev_close_index)
+
+
+def get_prev_close_futstk(security_id):
+    return _cached_prev_close("NSE_FNO", security_id, _fetch_prev_close_futstk)
+
+
+async def get_prev_close_async(client, security_id, spec=PREV_CLOSE_FUTSTK):
+    """get_prev_close_* on an AsyncDhanClient; `spec` is dhan.PREV_CLOSE_*."""
+    trade_date = datetime.now(IST).strftime("%Y-%m-%d")
+    cached = PREV_CLOSE_STORE.get(spec[0], security_id, trade_date)
+    if cached is not None:
+        return cached
+    close = await client.prev_close(security_id, *spec)
+    if close > 0:
+        PREV_CLOSE_STORE.put(spec[0], security_id, trade_date, close)
+    return close
+
+
+async def get_prev_close_index_async(client, security_id):
+    return await get_prev_close_async(client, security_id, PREV_CLOSE_INDEX)
+
+
+class SignalHistoryStore:
+    """
+    Bull / bear signal runs per trading day, behind "Strength (min)" and the
+    persistence score. SQLite holds an append-only log of "start" / "end"
+    events (written only when a signal appears or lapses); on a new day or
+    restart the open runs are rebuilt from it in one pass over the day's
+    rows, so strengths survive reloads and restarts.
+    """
+
+    KEEP_DAYS = 30
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.open = {}  # (side, symbol) -> first_seen datetime
+        self.loaded_day = None
+        cutoff = (datetime.now(IST) - timedelta(days=self.KEEP_DAYS)).strftime("%Y-%m-%d")
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS signal_events ("
+                " trade_date TEXT NOT NULL,"
+                " side TEXT NOT NULL,"
+                " symbol TEXT NOT NULL,"
+                " event TEXT NOT NULL,"
+                " ts REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS signal_events_day ON signal_events (trade_date, ts)"
+            )
+            self.conn.execute("DELETE FROM signal_events WHERE trade_date < ?", (cutoff,))
+
+    def load_day(self, trade_date):
+        rows = self.conn.execute(
+            "SELECT side, symbol, event, ts FROM signal_events"
+            " WHERE trade_date = ? ORDER BY ts, rowid",
+            (trade_date,),
+        ).fetchall()
+        runs = {}
+        for side, symbol, event, ts in rows:
+            if event == "start":
+                runs[(side, symbol)] = datetime.fromtimestamp(ts, IST)
+            else:
+                runs.pop((side, symbol), None)
+        self.open = runs
+        self.loaded_day = trade_date
+
+    def update(self, side, active, now):
+        """
+        Record that exactly `active` symbols carry `side` at `now`: new ones
+        start a run, open runs missing from it lapse. Returns
+        {symbol: minutes since its run started} for `active`.
+        """
+        trade_date = now.strftime("%Y-%m-%d")
+        active = set(active)
+        ts = now.timestamp()
+        with self.lock:
+            if self.loaded_day != trade_date:
+                self.load_day(trade_date)
+            events = []
+            for key in [k for k in self.open if k[0] == side and k[1] not in active]:
+                del self.open[key]
+                events.append((trade_date, side, key[1], "end", ts))
+            for symbol in active:
+                if (side, symbol) not in self.open:
+                    self.open[(side, symbol)] = now
+                    events.append((trade_date, side, symbol, "start", ts))
+            if events:
+                with self.conn:
+                    self.conn.executemany(
+                        "INSERT INTO signal_events VALUES (?, ?, ?, ?, ?)", events
+                    )
+            return {
+                symbol: round((now - self.open[(side, symbol)]).total_seconds() / 60.0, 1)
+                for symbol in active
+            }
+
+
+# Shared by every session; only the scan engine thread writes to it.
+SIGNAL_HISTORY = SignalHistoryStore(CACHE_DB_PATH)
+
+
+BAR_COLS = ["ts", "datetime", "Open", "High", "Low", "Close", "Volume", "OI"]
+
+SESSION_OPEN_SECONDS = 9 * 3600 + 15 * 60  # NSE candles are aligned to 09:15 IST
+IST_OFFSET_SECONDS = 19800
+
+
+def bucket_start(ts, interval_min):
+    """
+    Epoch start of the interval_min candle containing ts (09:15 IST aligned,
+    like Dhan's own candles). Works on ints and int64 arrays alike.
+    """
+    size = interval_min * 60
+    local = ts + IST_OFFSET_SECONDS
+    day = local - local % 86400
+    offset = local - day - SESSION_OPEN_SECONDS
+    return day + SESSION_OPEN_SECONDS + (offset // size) * size - IST_OFFSET_SECONDS
+
+
+def resample_bars(df, interval_min, base_min=BASE_INTERVAL_MIN):
+    """
+    Roll a BarStore frame of base_min bars up into interval_min bars with one
+    pass of NumPy reductions: first open, max high, min low, last close,
+    summed volume, last OI. The last bucket may still be forming.
+    """
+    if interval_min == base_min or df is None or df.empty:
+        return df
+    if interval_min % base_min:
+        raise ValueError(f"{interval_min}m bars cannot be built from {base_min}m bars")
+
+    ts = df["ts"].to_numpy(dtype=np.int64)
+    buckets = bucket_start(ts, interval_min)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+    out_ts = buckets[starts]
+    return pd.DataFrame(
+        {
+            "ts": out_ts,
+            "datetime": epoch_to_ist(out_ts),
+            "Open": df["Open"].to_numpy()[starts],
+            "High": np.maximum.reduceat(df["High"].to_numpy(), starts),
+            "Low": np.minimum.reduceat(df["Low"].to_numpy(), starts),
+            "Close": df["Close"].to_numpy()[ends],
+            "Volume": np.add.reduceat(df["Volume"].to_numpy(dtype=np.int64), starts),
+            "OI": df["OI"].to_numpy(dtype=np.int64)[ends],
+        }
+    )
+
+
+class BarStore:
+    """
+    Per-(security, interval) intraday bar history, in memory and in SQLite.
+    Callers fetch only from the last stored candle onward and `merge()` the
+    reply: the still-forming last candle is replaced, new candles appended.
+    `lock` guards both the connection and `mem`, which scan workers share.
+    """
+
+    KEEP_DAYS = 7
+
+    def __init__(self, path, keep_days=None):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.mem = {}
+        self.keep_days = keep_days or self.KEEP_DAYS
+        cutoff = int((datetime.now(IST) - timedelta(days=self.keep_days)).timestamp())
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS bars ("
+                " security_id TEXT NOT NULL,"
+                " interval INTEGER NOT NULL,"
+                " ts INTEGER NOT NULL,"
+                " open REAL, high REAL, low REAL, close REAL,"
+                " volume REAL, oi REAL,"
+                " PRIMARY KEY (security_id, interval, ts))"
+            )
+            self.conn.execute("DELETE FROM bars WHERE ts < ?", (cutoff,))
+
+    def _cached(self, key):
+        # Caller holds self.lock.
+        if key not in self.mem:
+            self.mem[key] = self._load(key)
+        return self.mem[key]
+
+    def _load(self, key):
+        rows = self.conn.execute(
+            "SELECT ts, open, high, low, close, volume, oi FROM bars"
+            " WHERE security_id = ? AND interval = ? ORDER BY ts",
+            key,
+        ).fetchall()
+        if not rows:
+            return None
+        df = pd.DataFrame(rows, columns=["ts", "Open", "High", "Low", "Close", "Volume", "OI"])
+        df = df.astype({"ts": "int64", "Volume": "int64", "OI": "int64"})
+        df.insert(1, "datetime", epoch_to_ist(df["ts"].to_numpy()))
+        return df
+
+    def get(self, security_id, interval):
+        with self.lock:
+            return self._cached((str(security_id), int(interval)))
+
+    def merge(self, security_id, interval, new_df, window_start_ts):
+        key = (str(security_id), int(interval))
+        with self.lock:
+            cached = self._cached(key)
+            if cached is None or cached.empty:
+                merged = new_df
+            elif new_df.empty:
+                merged = cached
+            else:
+                first_new = new_df["ts"].iloc[0]
+                merged = pd.concat(
+                    [cached[cached["ts"] < first_new], new_df[BAR_COLS]], ignore_index=True
+                )
+            if not merged.empty:
+                merged = merged.loc[
+                    merged["ts"] >= window_start_ts, BAR_COLS
+                ].reset_index(drop=True)
+            self.mem[key] = merged
+        self.write(security_id, interval, new_df)
+        return merged.copy()
+
+    def write(self, security_id, interval, df):
+        """Upsert bars into SQLite only (the in-memory copy is left alone)."""
+        if df is None or df.empty:
+            return
+        key = (str(security_id), int(interval))
+        rows = [
+            (key[0], key[1], int(r.ts), r.Open, r.High, r.Low, r.Close, r.Volume, r.OI)
+            for r in df.itertuples(index=False)
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+
+BAR_STORE = BarStore(CACHE_DB_PATH)
+
+
+def fetch_bars_incremental(security_id, instrument, from_d, to_d, interval_min=60):
+    """
+    Same contract as `_post_intraday_v2` (raises on errors, no st.* calls),
+    but only asks Dhan for candles from the last cached one onward.
+    """
+    window_start, fetch_from = _incremental_window(security_id, from_d, interval_min)
+    new_df = _post_intraday_v2(security_id, instrument, fetch_from, to_d, interval_min)
+    return BAR_STORE.merge(security_id, interval_min, new_df, window_start)
+
+
+async def fetch_bars_incremental_async(
+    client, security_id, instrument, from_d, to_d, interval_min=60
+):
+    """fetch_bars_incremental on an AsyncDhanClient (same cache, same contract)."""
+    # SQLite work (a cold key's window load, the merge's upsert + concat) runs
+    # off the event loop so the other requests keep flowing.
+    window_start, fetch_from = await asyncio.to_thread(
+        _incremental_window, security_id, from_d, interval_min
+    )
+    new_df = await client.intraday(security_id, instrument, fetch_from, to_d, interval_min)
+    return await asyncio.to_thread(
+        BAR_STORE.merge, security_id, interval_min, new_df, window_start
+    )
+
+
+def _incremental_window(security_id, from_d, interval_min):
+    # (window start epoch, fromDate to request): from the last cached candle
+    # when the cache reaches into the window, else the whole window.
+    window_start = IST.localize(datetime.strptime(from_d, "%Y-%m-%d")).timestamp()
+    cached = BAR_STORE.get(security_id, interval_min)
+    fetch_from = from_d
+    if cached is not None and not cached.empty and cached["ts"].iloc[-1] >= window_start:
+        # v2 intraday accepts "YYYY-MM-DD HH:MM:SS"; re-request the last
+        # (possibly still forming) candle so it gets replaced.
+        fetch_from = cached["datetime"].iloc[-1].strftime("%Y-%m-%d %H:%M:%S")
+    return window_start, fetch_from
+
+
+def fetch_timeframes(security_id, instrument, from_d, to_d, intervals, fetch=None):
+    """
+    {interval: bars} for every requested interval, all derived from a single
+    BASE_INTERVAL_MIN fetch (`fetch` defaults to fetch_bars_incremental).
+    Raises on errors like the fetch itself.
+    """
+    base = (fetch or fetch_bars_incremental)(
+        security_id, instrument, from_d, to_d, BASE_INTERVAL_MIN
+    )
+    return {m: resample_bars(base, m) for m in intervals}
+
+
+def _fetch_intraday_v2(security_id, instrument, from_d, to_d, interval_min=60, fetch=None):
+    try:
+        return fetch_timeframes(
+            security_id, instrument, from_d, to_d, (interval_min,), fetch
+        )[interval_min]
+    except Exception as e:
+        log_error(f"Dhan v2 intraday error ({instrument} {security_id}): {e}", "intraday")
+        return pd.DataFrame()
+
+def fetch_intraday_v2_futstk(security_id, from_d, to_d, interval_min=60, fetch=None):
+    return _fetch_intraday_v2(security_id, "FUTSTK", from_d, to_d, interval_min, fetch)
+
+def fetch_intraday_v2_futidx(security_id, from_d, to_d, interval_min=60, fetch=None):
+    if not security_id:
+        return pd.DataFrame()
+    return _fetch_intraday_v2(security_id, "FUTIDX", from_d, to_d, interval_min, fetch)
@@ -0,0 +1,104 @@
+"""
+Columnar scan results: one preallocated row per universe symbol in a NumPy
+structured array, rewritten in place by every scan. The bull / bear /
+all-data tables are boolean-mask views over it rather than lists of row
+dicts, built once per scan instead of on every fragment rerun.
+"""
+import numpy as np
+import pandas as pd
+
+from .config import CONFIRM_INTERVALS
+
+TV_CHART_URL = "https://in.tradingview.com/chart/?symbol=NSE:{}"
+
+BASE_FIELDS = [
+    ("Sym", object),
+    ("Symbol", object),  # TradingView chart link
+    ("LTP", np.float64),
+    ("Mom %", np.float64),
+    ("Price Chg%", np.float64),
+    ("Day Price%", np.float64),
+    ("RSI", np.float64),
+    ("ADX", np.float64),
+    ("Vol Ratio", np.float64),
+    ("OI Chg%", np.float64),
+    ("OI Signal", object),
+    ("Analysis", object),
+]
+CONFIRM_FIELDS = [
+    field
+    for m in CONFIRM_INTERVALS
+    for field in ((f"RSI {m}m", np.float64), (f"Mom {m}m %", np.float64))
+]
+SIGNAL_FIELDS = [
+    ("Strength (min)", np.float64),
+    ("TrendScore", np.int64),
+    ("PartScore", np.int64),
+    ("PersistScore", np.int64),
+    ("Conviction", np.int64),
+    ("TF Confirm", object),
+]
+STOCK_DTYPE = np.dtype(
+    BASE_FIELDS + CONFIRM_FIELDS + SIGNAL_FIELDS + [("side", object), ("has_data", np.bool_)]
+)
+
+ALL_COLUMNS = [name for name, _ in BASE_FIELDS + CONFIRM_FIELDS]  # "All Data" tab
+SIGNAL_COLUMNS = ALL_COLUMNS + [name for name, _ in SIGNAL_FIELDS]  # bull / bear tables
+
+
+class ScanTable:
+    """
+    Per-symbol scan results for the whole universe, one row per symbol in
+    symbol order. update() overwrites this scan's columns in place; the
+    array is only reallocated when the universe itself changes.
+    """
+
+    def __init__(self, symbols=()):
+        self.reset(symbols)
+
+    def reset(self, symbols):
+        self.symbols = sorted(symbols)
+        self.pos = {sym: i for i, sym in enumerate(self.symbols)}
+        self.rows = np.zeros(len(self.symbols), dtype=STOCK_DTYPE)
+        for name, kind in BASE_FIELDS + SIGNAL_FIELDS + [("side", object)]:
+            if kind is object:
+                self.rows[name] = ""
+        self.rows["Sym"] = self.symbols
+        self.rows["Symbol"] = [TV_CHART_URL.format(sym) for sym in self.symbols]
+
+    def ensure(self, symbols):
+        """Reallocate for a new universe (e.g. after the monthly contract roll)."""
+        if len(symbols) != len(self.pos) or any(sym not in self.pos for sym in symbols):
+            self.reset(symbols)
+
+    def update(self, syms, columns):
+        """
+        Write `columns` ({field: values aligned with syms}) into those rows
+        in place; every other symbol is marked as having no data this scan.
+        """
+        idx = np.fromiter((self.pos[sym] for sym in syms), dtype=np.intp, count=len(syms))
+        self.rows["has_data"] = False
+        for name, values in columns.items():
+            self.rows[name][idx] = values
+        self.rows["has_data"][idx] = True
+
+    def _frame(self, idx, columns):
+        return pd.DataFrame({name: self.rows[name][idx] for name in columns})
+
+    def views(self):
+        """
+        (bull, bear, all_data) DataFrames for the snapshot (copies, so the
+        next scan can keep writing): boolean masks over the rows, bull /
+        bear ranked by conviction, all_data in symbol order.
+        """
+        has_data = self.rows["has_data"]
+        out = []
+        for side in ("bull", "bear"):
+            idx = np.flatnonzero(has_data & (self.rows["side"] == side))
+            idx = idx[np.argsort(-self.rows["Conviction"][idx], kind="stable")]
+            out.append(self._frame(idx, SIGNAL_COLUMNS))
+        out.append(self._frame(np.flatnonzero(has_data), ALL_COLUMNS))
+        return tuple(out)
+
+
+SCAN_TABLE = ScanTable()
@@ -0,0 +1,163 @@
+"""
+IndicatorEngine vs a full recompute of pandas_ta's rsi(14), adx(14) and
+ema(5), written out in plain pandas below: the pandas_ta 0.3.x formulas the
+engine implements (checked against pandas_ta itself when a 0.3.x release
+is installed; 0.4 smooths with adjust=False and an SMA-seeded ATR).
+
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from fno_scanner.indicators import ADX_LEN, EMA_LEN, RSI_LEN, IndicatorEngine
+
+BAR_SECONDS = 300
+KEY = ("52175", 5)
+
+
+def rma(series, length):
+    return series.ewm(alpha=1.0 / length, min_periods=length).mean()
+
+
+def ref_rsi(close, length=RSI_LEN):
+    diff = close.diff()
+    positive = diff.copy()
+    negative = diff.copy()
+    positive[positive < 0] = 0
+    negative[negative > 0] = 0
+    positive_avg = rma(positive, length)
+    negative_avg = rma(negative, length)
+    return 100 * positive_avg / (positive_avg + negative_avg.abs())
+
+
+def ref_adx(high, low, close, length=ADX_LEN):
+    prev_close = close.shift(1)
+    tr = pd.concat([high - low, high - prev_close, prev_close - low], axis=1).abs().max(axis=1)
+    tr.iloc[:1] = np.nan
+    atr = rma(tr, length)
+
+    up = high - high.shift(1)
+    dn = low.shift(1) - low
+    pos = ((up > dn) & (up > 0)) * up
+    neg = ((dn > up) & (dn > 0)) * dn
+    k = 100 / atr
+    dmp = k * rma(pos, length)
+    dmn = k * rma(neg, length)
+    dx = 100 * (dmp - dmn).abs() / (dmp + dmn)
+    return rma(dx, length)
+
+
+def ref_ema(close, length=EMA_LEN):
+    close = close.copy()
+    sma_nth = close[:length].mean()
+    close[: length - 1] = np.nan
+    close.iloc[length - 1] = sma_nth
+    return close.ewm(span=length, adjust=False).mean()
+
+
+def reference(df):
+    """(rsi, adx, ema) of the last bar, recomputed over the whole frame."""
+    high, low, close = df["High"], df["Low"], df["Close"]
+    if len(df) < EMA_LEN:
+        ema = np.nan
+    else:
+        ema = ref_ema(close).iloc[-1]
+    return ref_rsi(close).iloc[-1], ref_adx(high, low, close).iloc[-1], ema
+
+
+def make_bars(n, seed=0, start_ts=1767584700):
+    """Random 5-minute bars on a 0.05 tick, so equal highs / lows occur."""
+    rng = np.random.default_rng(seed)
+    close = np.round((1000 + rng.normal(0, 2.0, n).cumsum()) / 0.05) * 0.05
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    wick = np.round(rng.exponential(1.0, (2, n)) / 0.05) * 0.05
+    return pd.DataFrame(
+        {
+            "ts": start_ts + BAR_SECONDS * np.arange(n, dtype=np.int64),
+            "High": np.maximum(open_, close) + wick[0],
+            "Low": np.minimum(open_, close) - wick[1],
+            "Close": close,
+        }
+    )
+
+
+def assert_matches(engine, df):
+    got = engine.update(KEY, df.reset_index(drop=True))
+    np.testing.assert_allclose(got, reference(df), rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_first_build():
+    bars = make_bars(150)
+    for n in (1, 2, EMA_LEN - 1, EMA_LEN, RSI_LEN - 1, RSI_LEN, RSI_LEN + 1, 2 * ADX_LEN, 150):
+        assert_matches(IndicatorEngine(), bars.iloc[:n])
+
+
+def test_forming_bar_updates():
+    engine = IndicatorEngine()
+    bars = make_bars(80, seed=1)
+    assert_matches(engine, bars)
+    state = engine.states[KEY]
+    rng = np.random.default_rng(2)
+    for _ in range(10):
+        # The forming candle ticks: new close, wicks can only grow.
+        close = bars["Close"].iat[-1] + round(rng.normal(0, 2.0) / 0.05) * 0.05
+        bars.loc[bars.index[-1], "Close"] = close
+        bars.loc[bars.index[-1], "High"] = max(bars["High"].iat[-1], close)
+        bars.loc[bars.index[-1], "Low"] = min(bars["Low"].iat[-1], close)
+        assert_matches(engine, bars)
+        assert engine.states[KEY] is state
+
+
+def test_new_bars():
+    engine = IndicatorEngine()
+    bars = make_bars(200, seed=3)
+    assert_matches(engine, bars.iloc[:20])
+    state = engine.states[KEY]
+    n = 20
+    for step in [1] * 30 + [3, 1, 7, 1, 2]:
+        n += step
+        assert_matches(engine, bars.iloc[:n])
+        assert engine.states[KEY] is state
+
+
+def test_window_slide_rebuilds():
+    engine = IndicatorEngine()
+    bars = make_bars(300, seed=4)
+    assert_matches(engine, bars.iloc[:150])
+    # Next day: the scan window drops the oldest bars.
+    assert_matches(engine, bars.iloc[75:151])
+    assert engine.states[KEY].first_ts == bars["ts"].iat[75]
+    for n in range(152, 170):
+        assert_matches(engine, bars.iloc[75:n])
+
+
+def test_rewritten_committed_bar_rebuilds():
+    engine = IndicatorEngine()
+    bars = make_bars(100, seed=6)
+    assert_matches(engine, bars)
+    # A late correction to the last closed bar, the forming bar unchanged.
+    bars.loc[bars.index[-2], ["High", "Close"]] += 3.0
+    assert_matches(engine, bars)
+    bars.loc[bars.index[-2], "Low"] -= 1.0
+    assert_matches(engine, bars.iloc[:-1])
+
+
+def test_reference_matches_pandas_ta():
+    ta = pytest.importorskip("pandas_ta")
+    if not str(ta.version).startswith("0.3"):
+        pytest.skip(f"pandas_ta {ta.version} changed its rma / atr smoothing")
+    bars = make_bars(200, seed=5)
+    high, low, close = bars["High"], bars["Low"], bars["Close"]
+    pd.testing.assert_series_equal(
+        ref_rsi(close), ta.rsi(close, RSI_LEN), check_names=False, rtol=1e-9
+    )
+    pd.testing.assert_series_equal(
+        ref_adx(high, low, close),
+        ta.adx(high, low, close, ADX_LEN)[f"ADX_{ADX_LEN}"],
+        check_names=False,
+        rtol=1e-9,
+    )
+    pd.testing.assert_series_equal(
+        ref_ema(close), ta.ema(close, EMA_LEN), check_names=False, rtol=1e-9
+    )
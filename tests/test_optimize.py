@@ -0,0 +1,98 @@
+"""
+SharedArrays across processes: pool workers (fork and spawn) and unrelated
+processes attach without the resource tracker unlinking the owner's blocks
+or complaining about them. Each case runs in a fresh interpreter so the
+tracker's own stderr is captured too.
+
+    python -m pytest tests
+"""
+import multiprocessing
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+POOL_SCRIPT = """
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from fno_scanner.optimize import SharedArrays
+
+_WORKER = {}
+
+
+def init(spec):
+    _WORKER["blocks"], _WORKER["arrays"] = SharedArrays.attach(spec, child=True)
+
+
+def total(i):
+    return float(_WORKER["arrays"]["a"].sum()) + i
+
+
+if __name__ == "__main__":
+    shared = SharedArrays({"a": np.arange(10.0)})
+    ctx = multiprocessing.get_context(sys.argv[1])
+    with ProcessPoolExecutor(2, mp_context=ctx, initializer=init, initargs=(shared.spec,)) as pool:
+        print(list(pool.map(total, range(4))))
+    shared.close()
+"""
+
+STANDALONE_SCRIPT = """
+import subprocess
+import sys
+
+import numpy as np
+
+from fno_scanner.optimize import SharedArrays
+
+if __name__ == "__main__":
+    shared = SharedArrays({"a": np.arange(10.0)})
+    # A separate interpreter (own resource tracker) attaches and exits.
+    attach = (
+        "from fno_scanner.optimize import SharedArrays; "
+        f"blocks, arrays = SharedArrays.attach({shared.spec!r}); "
+        "print(arrays['a'].sum())"
+    )
+    out = subprocess.run([sys.executable, "-c", attach], capture_output=True, text=True)
+    print(out.stdout.strip(), out.stderr.strip() or "-")
+    blocks, arrays = SharedArrays.attach(shared.spec, child=True)
+    print(arrays["a"].sum())
+    del arrays
+    for shm in blocks:
+        shm.close()
+    shared.close()
+"""
+
+
+def run_script(tmp_path, source, *args):
+    path = tmp_path / "script.py"
+    path.write_text(textwrap.dedent(source))
+    path_entries = [REPO, os.environ.get("PYTHONPATH")]
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(p for p in path_entries if p))
+    return subprocess.run(
+        [sys.executable, str(path), *args], capture_output=True, text=True, env=env, timeout=120
+    )
+
+
+@pytest.mark.parametrize("method", ["fork", "spawn"])
+def test_pool_workers_attach(tmp_path, method):
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"{method} not available")
+    out = run_script(tmp_path, POOL_SCRIPT, method)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split("\n")[0] == "[45.0, 46.0, 47.0, 48.0]"
+    assert out.stderr == ""
+
+
+def test_unrelated_process_leaves_blocks_to_the_owner(tmp_path):
+    out = run_script(tmp_path, STANDALONE_SCRIPT)
+    assert out.returncode == 0, out.stderr
+    assert out.stdout.split() == ["45.0", "-", "45.0"]
+    assert out.stderr == ""
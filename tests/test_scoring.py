@@ -0,0 +1,180 @@
+"""
+Batch scorers vs the scalar reference functions in fno_scanner.scoring.
+
+    python -m pytest tests
+"""
+import numpy as np
+import pytest
+
+from fno_scanner.scoring import (
+    batch_conviction,
+    batch_oi_signal,
+    batch_signal_side,
+    batch_trend_analysis,
+    compute_conviction,
+    get_oi_signal,
+    get_trend_analysis,
+)
+
+NAN = float("nan")
+OI_LABELS = [
+    "Long Buildup 🟢",
+    "Short Buildup 🔴",
+    "Short Covering 🟡",
+    "Long Unwinding 🟠",
+    "No Clear OI ⚪",
+    "No OI Data ❔",
+]
+
+# Every threshold the scorers compare against, on both sides of zero.
+RSI_EDGES = [NAN, 0.0, 24.9, 25, 30, 35, 45, 50, 52, 55, 60, 65, 70, 75, 75.1]
+ADX_EDGES = [NAN, 0.0, 20, 20.1, 25, 25.1, 30, 30.1]
+MOM_EDGES = [-0.71, -0.7, -0.3, 0.0, 0.3, 0.31, 0.7, 0.71]
+VOL_EDGES = [0.0, 1.1, 1.11, 1.2, 1.21, 1.5, 2.0]
+OI_EDGES = [-8, -5, -2.01, -2, 0.0, 2, 2.01, 5, 8]
+PRICE_EDGES = [
+    -2, -1, -0.51, -0.5, -0.31, -0.3, -0.1, -0.09, 0.0, 0.09, 0.1, 0.3, 0.31, 0.5, 0.51, 1, 2
+]
+STRENGTH_EDGES = [0, 14, 15, 30, 60, 90]
+
+
+def scalar_side(rsi, vol_ratio, oi_available, oi_signal, day_price_chg, p_chg):
+    """The scanner's original per-symbol bull / bear entry rules."""
+    if oi_available and "Buildup" in oi_signal:
+        if day_price_chg > 0 and p_chg > 0:
+            return "bull"
+        if day_price_chg < 0 and p_chg < 0:
+            return "bear"
+        return ""
+    if rsi > 0:
+        if p_chg > 0.3 and rsi > 55 and vol_ratio > 1.1:
+            return "bull"
+        if p_chg < -0.3 and rsi < 52 and vol_ratio > 1.1:
+            return "bear"
+    return ""
+
+
+def random_rows(n, seed):
+    """Random scorer inputs, a share of them snapped to threshold values."""
+    rng = np.random.default_rng(seed)
+
+    def column(lo, hi, edges):
+        values = rng.uniform(lo, hi, n).round(2)
+        snap = rng.random(n) < 0.3
+        values[snap] = rng.choice(edges, snap.sum())
+        return values
+
+    return {
+        "side": rng.choice(["bull", "bear"], n).astype(object),
+        "rsi": column(0, 100, RSI_EDGES),
+        "adx": column(0, 60, ADX_EDGES),
+        "mom": column(-2, 2, MOM_EDGES),
+        "vol_ratio": column(0, 3, VOL_EDGES),
+        "oi_chg": column(-12, 12, OI_EDGES),
+        "oi_signal": rng.choice(OI_LABELS, n).astype(object),
+        "strength_min": rng.choice(STRENGTH_EDGES + [45, 120], n).astype(float),
+        "day_price_chg": column(-4, 4, PRICE_EDGES),
+        "p_chg": column(-2, 2, PRICE_EDGES),
+        "oi_available": rng.random(n) < 0.7,
+    }
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_trend_analysis_matches_scalar(seed):
+    rows = random_rows(2000, seed)
+    batch = batch_trend_analysis(rows["p_chg"], rows["vol_ratio"])
+    for i, label in enumerate(batch):
+        assert label == get_trend_analysis(rows["p_chg"][i], rows["vol_ratio"][i])
+
+
+def test_oi_signal_matches_scalar_on_thresholds():
+    oi, day = np.meshgrid(OI_EDGES, PRICE_EDGES)
+    oi, day = oi.ravel(), day.ravel()
+    batch = batch_oi_signal(oi, day)
+    for i, label in enumerate(batch):
+        assert label == get_oi_signal(oi[i], day[i])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_oi_signal_matches_scalar(seed):
+    rows = random_rows(2000, seed)
+    batch = batch_oi_signal(rows["oi_chg"], rows["day_price_chg"], rows["oi_available"])
+    for i, label in enumerate(batch):
+        if rows["oi_available"][i]:
+            assert label == get_oi_signal(rows["oi_chg"][i], rows["day_price_chg"][i])
+        else:
+            assert label == "No OI Data ❔"
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_signal_side_matches_scalar(seed):
+    rows = random_rows(2000, seed)
+    args = [
+        rows[k]
+        for k in ("rsi", "vol_ratio", "oi_available", "oi_signal", "day_price_chg", "p_chg")
+    ]
+    batch = batch_signal_side(*args)
+    for i, side in enumerate(batch):
+        assert side == scalar_side(*(a[i] for a in args))
+
+
+CONVICTION_KEYS = (
+    "side",
+    "rsi",
+    "adx",
+    "mom",
+    "vol_ratio",
+    "oi_chg",
+    "oi_signal",
+    "strength_min",
+    "day_price_chg",
+    "p_chg",
+)
+
+
+def assert_conviction_parity(rows):
+    args = [rows[k] for k in CONVICTION_KEYS]
+    batch = np.column_stack(batch_conviction(*args))
+    for i in range(len(batch)):
+        ref = compute_conviction(*(a[i] for a in args))
+        assert tuple(int(v) for v in batch[i]) == ref, {k: rows[k][i] for k in CONVICTION_KEYS}
+
+
+def test_conviction_matches_scalar_on_thresholds():
+    grid = np.array(
+        np.meshgrid(RSI_EDGES, ADX_EDGES, MOM_EDGES, ["bull", "bear"], indexing="ij"),
+        dtype=object,
+    ).reshape(4, -1)
+    n = grid.shape[1]
+    rng = np.random.default_rng(7)
+    rows = {
+        "rsi": grid[0].astype(float),
+        "adx": grid[1].astype(float),
+        "mom": grid[2].astype(float),
+        "side": grid[3],
+        "vol_ratio": rng.choice(VOL_EDGES, n),
+        "oi_chg": rng.choice(OI_EDGES, n).astype(float),
+        "oi_signal": rng.choice(OI_LABELS, n).astype(object),
+        "strength_min": rng.choice(STRENGTH_EDGES, n).astype(float),
+        "day_price_chg": rng.choice(PRICE_EDGES, n).astype(float),
+        "p_chg": rng.choice(PRICE_EDGES, n).astype(float),
+    }
+    assert_conviction_parity(rows)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_conviction_matches_scalar(seed):
+    assert_conviction_parity(random_rows(5000, seed))
+
+
+def test_nan_rsi_is_never_a_technical_signal():
+    n = 4
+    side = batch_signal_side(
+        np.full(n, NAN),
+        np.full(n, 2.0),
+        np.zeros(n, dtype=bool),
+        np.full(n, "No OI Data ❔", dtype=object),
+        np.array([1.0, -1.0, 1.0, -1.0]),
+        np.array([1.0, -1.0, -1.0, 1.0]),
+    )
+    assert list(side) == [""] * n